@@ -2,17 +2,28 @@
 # Imports
 import os
 os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify,flash
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify,flash, Response, g
+import time
+import threading
 import pandas as pd
 from influxdb_client import InfluxDBClient
 import plotly
 import plotly.graph_objects as go
 import json
 from components.PredictionModel import PredictionModel
+from components.TimeSeriesCache import TimeSeriesCache
+from components.Downsample import build_series_payload
+from components.ForecastScheduler import ForecastScheduler
+from components.Sensors import load_sensors, find_sensor
+from components.AlertOutbox import AlertOutbox
+from components.ThresholdEngine import ThresholdEngine, summarise_excursions
+from components.LiveUpdates import LiveUpdates
+from components.Metrics import metrics
+from components.ProcessLock import ProcessLock
 from dotenv import load_dotenv
 from components.login import login_user, logout_user
 from flask import session, redirect, url_for
-from components.Alert import  SettingsForm, send_email, save_config, load_config, alert_for_predicted_values,check_proactive_status,check_current_status,evaluate_sensor_status
+from components.Alert import  SettingsForm, send_email, deliver_email, deliver_sms, save_config, load_config, alert_for_predicted_values
 from flask import Flask, render_template, request, redirect, url_for, session
 from dotenv import load_dotenv
 
@@ -31,9 +42,118 @@ app.secret_key = os.environ.get('SECRET_KEY')
 client = InfluxDBClient(url=INFLUXDB_URL, token=INFLUXDB_TOKEN, org=INFLUXDB_ORG)
 query_api = client.query_api()
 
+# Sensors monitored by the dashboard (configs/Sensors.json), loaded once at startup
+SENSORS = load_sensors()
+
+# Cache the last 30 days of readings locally and only fetch new points from InfluxDB on each refresh
+CACHE_DIR = os.environ.get('CACHE_DIR', 'cache')
+CACHE_REFRESH_SECONDS = int(os.environ.get('CACHE_REFRESH_SECONDS', 30))
+series_cache = TimeSeriesCache(query_api, INFLUXDB_BUCKET, INFLUXDB_ORG, window_days=30, refresh_interval=CACHE_REFRESH_SECONDS, snapshot_dir=CACHE_DIR)
+
 # Define the model path and initialize the prediction model using a specific path
 MODEL_PATH = os.environ.get('MODEL_PATH')
-prediction_model = PredictionModel(MODEL_PATH)
+# Inference backend: 'numpy' runs the exported weights without TensorFlow, 'tensorflow' loads the SavedModel, 'auto' prefers numpy
+MODEL_BACKEND = os.environ.get('MODEL_BACKEND', 'auto')
+MODEL_WEIGHTS_PATH = os.environ.get('MODEL_WEIGHTS_PATH', 'models/LSTMModel/LSTMModelWeights.npz')
+prediction_model = PredictionModel(MODEL_PATH, backend=MODEL_BACKEND, weights_path=MODEL_WEIGHTS_PATH)
+
+# Queue alerts in a persistent outbox drained by background workers, merging repeats per sensor and severity within the cooldown
+ALERT_COOLDOWN_HOURS = float(os.environ.get('ALERT_COOLDOWN_HOURS', 2))
+ALERT_WORKERS = int(os.environ.get('ALERT_WORKERS', 2))
+alert_outbox = AlertOutbox(
+    senders={
+        'email': deliver_email,
+        'sms': lambda to_phone, subject, message: deliver_sms(to_phone, message),
+    },
+    path=os.path.join(CACHE_DIR, 'alert_outbox.json'),
+    cooldown_hours=ALERT_COOLDOWN_HOURS,
+    workers=ALERT_WORKERS,
+)
+
+# Function run by the scheduler for every new forecast: alert for predicted values if the current value is normal
+def alert_on_forecast(forecast):
+    alert_for_predicted_values(forecast.to_dataframe(), forecast.last_value, load_config(), outbox=alert_outbox, sensor=forecast.measurement)
+
+# Compute forecasts in the background once per new reading so page views only read the stored result
+FORECAST_INTERVAL_SECONDS = int(os.environ.get('FORECAST_INTERVAL_SECONDS', 60))
+FORECAST_STALE_MINUTES = int(os.environ.get('FORECAST_STALE_MINUTES', 15))
+# Push new readings, forecasts and status changes to connected dashboards from the scheduler's single poll
+# Each open stream holds one server thread, so at most LIVE_STREAM_LIMIT are served and further dashboards poll /api/live
+LIVE_STREAM_LIMIT = int(os.environ.get('LIVE_STREAM_LIMIT', 8))
+live_updates = LiveUpdates(SENSORS, lambda: ThresholdEngine.from_config(load_config()), max_streams=LIVE_STREAM_LIMIT)
+forecast_scheduler = ForecastScheduler(series_cache, prediction_model, interval=FORECAST_INTERVAL_SECONDS, on_forecast=alert_on_forecast, on_update=live_updates.publish_update)
+for sensor in SENSORS:
+    forecast_scheduler.add_measurement(sensor['measurement'])
+
+# The scheduler and outbox keep their state in this process (forecasts, live update subscribers, alert cooldowns),
+# so they must run in exactly one process: run a single worker with threads, e.g. gunicorn --workers 1 --threads 16 app:app
+background_lock = ProcessLock(os.path.join(CACHE_DIR, 'background.lock'))
+
+# Function to check whether this process is the Werkzeug reloader's file watcher, which imports the app but never serves requests
+def is_reloader_watcher():
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        return False
+    if __name__ == "__main__":
+        # python app.py runs app.run(debug=True), which starts the reloader
+        return True
+    return os.environ.get("FLASK_RUN_FROM_CLI") == "true" and os.environ.get("FLASK_DEBUG", "").lower() in ("1", "true", "yes")
+
+# Function to start the forecast scheduler and alert outbox workers once this process holds the background lock
+# If another process holds it (e.g. the old worker during a gunicorn HUP reload) this one keeps serving requests and
+# retries from a background thread, taking over the services when the other process exits
+def start_background_services(retry_seconds=5):
+    def start():
+        alert_outbox.start()
+        forecast_scheduler.start()
+
+    if background_lock.acquire():
+        start()
+        return
+
+    print(f"Another process holds {background_lock.path} and runs the forecast scheduler and alert outbox, "
+          "waiting for it to exit. If this persists, run a single worker process (e.g. gunicorn --workers 1 --threads 16 app:app).")
+
+    def wait_for_lock():
+        while not background_lock.acquire():
+            time.sleep(retry_seconds)
+        print("Background lock acquired, starting the forecast scheduler and alert outbox")
+        start()
+
+    threading.Thread(target=wait_for_lock, name="background-lock", daemon=True).start()
+
+if not is_reloader_watcher():
+    start_background_services()
+
+# Allow ?profile=1 or an X-Profile header to return a per-stage Server-Timing breakdown for that request
+METRICS_PROFILING = os.environ.get('METRICS_PROFILING', 'false').lower() in ('1', 'true', 'yes')
+
+# Function to start timing each request and, if requested, collecting its stage timings
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.profiling = METRICS_PROFILING and (request.args.get("profile") == "1" or "X-Profile" in request.headers)
+    if g.profiling:
+        metrics.start_profile()
+
+# Function to record the request duration per endpoint and add the stage breakdown when profiling
+@app.after_request
+def record_request_time(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+    duration = time.perf_counter() - started
+    metrics.observe('http_request_duration_seconds', duration, endpoint=request.endpoint or "unknown")
+    if g.pop("profiling", False):
+        stages = metrics.stop_profile()
+        timings = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in stages]
+        timings.append(f"total;dur={duration * 1000:.2f}")
+        response.headers["Server-Timing"] = ", ".join(timings)
+    return response
+
+# /metrics route exposing the counters and stage histograms in the Prometheus text format
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 # /send-test-email route
 @app.route('/send-test-email', methods=['POST'])
@@ -90,6 +210,89 @@ def settings():
         form.phone_number.data = config_data.get('PHONE_NUMBER', '+1234567890')
     return render_template('settings.html', form=form)
 
+# Function to parse a start/end query parameter (epoch milliseconds or a date string, UTC) into epoch nanoseconds
+def parse_series_time(value):
+    if value is None or value == "":
+        return None
+    try:
+        return int(float(value) * 1e6)
+    except ValueError:
+        timestamp = pd.Timestamp(value)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.tz_localize("UTC")
+        return timestamp.value
+
+# /api/series route returning a downsampled window of readings for the dashboard chart
+@app.route("/api/series")
+def api_series():
+    if "username" not in session:
+        return jsonify(error="Not logged in"), 401
+    sensor = find_sensor(SENSORS, request.args.get("sensor"))
+    try:
+        start = parse_series_time(request.args.get("start"))
+        end = parse_series_time(request.args.get("end"))
+        points = min(max(int(request.args.get("points", 1000)), 4), 10000)
+    except (ValueError, OverflowError) as e:
+        return jsonify(error=f"Invalid parameter: {e}"), 400
+
+    timestamps, values = series_cache.refresh(sensor['measurement'])
+    with metrics.stage('series_downsample'):
+        payload = build_series_payload(timestamps, values, start, end, points)
+    payload["sensor"] = sensor['id']
+    payload["measurement"] = sensor['measurement']
+    return jsonify(payload)
+
+# /api/stream route pushing live updates for one sensor as Server-Sent Events
+@app.route("/api/stream")
+def api_stream():
+    if "username" not in session:
+        return jsonify(error="Not logged in"), 401
+    sensor = find_sensor(SENSORS, request.args.get("sensor"))
+    stream = live_updates.stream(sensor['id'])
+    if stream is None:
+        # Keep threads free for page requests, the dashboard falls back to polling /api/live
+        response = jsonify(error="Too many live streams open, poll /api/live instead")
+        response.status_code = 503
+        response.headers["Retry-After"] = "60"
+        return response
+    response = Response(stream, mimetype="text/event-stream")
+    # Stop proxies from buffering or caching the stream
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+# /api/live route returning the current live state of one sensor, polled by dashboards that could not open a stream
+@app.route("/api/live")
+def api_live():
+    if "username" not in session:
+        return jsonify(error="Not logged in"), 401
+    sensor = find_sensor(SENSORS, request.args.get("sensor"))
+    return jsonify(events=[{'event': event, 'data': data} for event, data in live_updates.snapshot_events(sensor['id'])])
+
+# Excursion analytics per sensor, reused until a new reading arrives or the thresholds change
+excursion_cache = {}
+
+# /api/excursions route returning time in each band and the excursions over the cached 30 day history
+@app.route("/api/excursions")
+def api_excursions():
+    if "username" not in session:
+        return jsonify(error="Not logged in"), 401
+    sensor = find_sensor(SENSORS, request.args.get("sensor"))
+    limit = request.args.get("limit", 20, type=int)
+
+    thresholds = ThresholdEngine.from_config(load_config())
+    timestamps, values = series_cache.refresh(sensor['measurement'])
+    cache_key = (len(timestamps), int(timestamps[-1]) if len(timestamps) else None, thresholds.key())
+    cached = excursion_cache.get(sensor['measurement'])
+    if cached is None or cached[0] != cache_key:
+        metrics.inc('cache_requests_total', cache='excursions', result='miss')
+        with metrics.stage('excursion_analytics'):
+            cached = (cache_key, thresholds.excursion_analytics(timestamps, values))
+        excursion_cache[sensor['measurement']] = cached
+    else:
+        metrics.inc('cache_requests_total', cache='excursions', result='hit')
+    return jsonify(sensor=sensor['id'], **summarise_excursions(cached[1], limit))
+
 @app.route("/")
 def home():
     
@@ -106,18 +309,12 @@ def home():
     critical_temp_low = config.get('CRITICAL_TEMP_LOW', float('inf'))
     critical_temp_high = config.get('CRITICAL_TEMP_HIGH', float('inf'))
     
-    # Query InfluxDB to retrieve the last 30 days of temperature data
-    query = f'from(bucket: "{INFLUXDB_BUCKET}") |> range(start: -30d) |> filter(fn: (r) => r._measurement == "B0A732FFFFF1A160_BLE_0_0_0_E2C4F3FFFF199E64_RuuviTag_0_Temperature") |> filter(fn: (r) => exists r._value)'
-    result = query_api.query(org=INFLUXDB_ORG, query=query)
-
-
-    # Process the results into a DataFrame and sort by timestamp
-    data = [
-        (record.get_time(), record.get_value())
-        for table in result
-        for record in table.records
-    ]
-    df = pd.DataFrame(data, columns=["timestamp", "value"]).sort_values(by="timestamp")
+    # Select the sensor to display, defaulting to the first configured sensor
+    sensor = find_sensor(SENSORS, request.args.get("sensor"))
+
+    # Retrieve the last 30 days of temperature data from the local cache (already sorted by timestamp)
+    with metrics.stage('cache_dataframe'):
+        df = series_cache.get_dataframe(sensor['measurement'])
     
     # Initialize placeholders for the last actual and next predicted values
     last_12actual_values = pd.DataFrame(columns=["timestamp", "value"])
@@ -127,66 +324,49 @@ def home():
         df["timestamp"] = pd.to_datetime(df["timestamp"])
         last_12actual_values = df.tail(12)  # Get the last 10 actual values
 
-    # Get the current and last predicted values
-    current_value = float(df['value'].iloc[-1]) if not df.empty else None
-    current_status = evaluate_sensor_status(df, next_12predicted_values, config)
-    
-    # Check if DataFrame for sensor values is not empty and contains enough data for prediction, then process the data through the prediction model
-    if not df.empty and len(df["value"]) >= prediction_model.sequence_length:
-        # Extract the last sequence_length values from the DataFrame for input to the model
-        input_sequence = df["value"][-prediction_model.sequence_length:].to_numpy()
-        # Normalize the extracted input sequence to be within the scale expected by the model
-        normalized_input_sequence = prediction_model.normalize(input_sequence)
-        # Reshape the normalized data to match the input shape required by the model
-        reshaped_input = normalized_input_sequence.reshape(1, prediction_model.sequence_length, 1)
-        # Generate predictions using the reshaped input sequence
-        predictions = prediction_model.predict(reshaped_input)
-        # Create a range of future timestamps for the predicted values, starting 5 minutes after the last available timestamp
-        prediction_intervals = pd.date_range(start=df["timestamp"].iloc[-1] + pd.Timedelta(minutes=5), periods=len(predictions), freq="5min")
-        # Create a DataFrame to hold the future timestamps and corresponding predicted values
-        next_12predicted_values = pd.DataFrame({"timestamp": prediction_intervals, "predicted_value": predictions})
-
-        # Alert for predicted values if current value is normal
-        alert_for_predicted_values(next_12predicted_values, current_value, config)
-
-    # Create a Plotly figure and add the actual and predicted
-    fig = go.Figure()
-    fig.add_trace(
-        go.Scatter(x=df["timestamp"], y=df["value"], mode="lines", name="Actual Data")
-    )
-    
-    # If there are predicted values available, add them as a new trace to the Plotly graph
-    if not next_12predicted_values.empty:
+    # Read the forecast computed in the background for the latest reading (no inference on the request path)
+    forecast = forecast_scheduler.get(sensor['measurement'])
+    forecast_age_minutes = None
+    forecast_input_age_minutes = None
+    forecast_stale = False
+    if forecast is not None:
+        next_12predicted_values = forecast.to_dataframe()
+        forecast_age_minutes = int(forecast.age_seconds() // 60)
+        forecast_input_age_minutes = int(forecast.input_age_seconds() // 60)
+        # Flag the forecast as stale if it was not computed from the latest cached reading or that reading is old
+        latest_timestamp = df["timestamp"].iloc[-1] if not df.empty else None
+        forecast_stale = (latest_timestamp is not None and forecast.input_timestamp < latest_timestamp) or forecast_input_age_minutes > FORECAST_STALE_MINUTES
+
+    # Create a Plotly figure with an empty actual trace, the readings are fetched downsampled from /api/series by the page
+    with metrics.stage('figure_build'):
+        fig = go.Figure()
         fig.add_trace(
-            go.Scatter(
-                x=next_12predicted_values["timestamp"],
-                y=next_12predicted_values["predicted_value"],
-                mode="lines",
-                name="Predictions",
-            )
+            go.Scatter(x=[], y=[], mode="lines", name="Actual Data")
         )
+        fig.update_layout(xaxis=dict(type="date"))
 
-    
-    # Status Checking for sensor
-    current_status = "normal"  
-
-    if not df.empty:
-        # Check the last recorded value in the dataframe
-        last_value = df['value'].iloc[-1]
-        # Determine the current status based on temperature thresholds
-        current_status = check_current_status(last_value, warning_temp_low, warning_temp_high, critical_temp_low, critical_temp_high)
-
-        # Only check predictions status if current status is normal
-        if current_status == "normal":  
-            predicted_values = next_12predicted_values['predicted_value'].apply(float).tolist()
-            predictive_status = check_proactive_status(predicted_values, warning_temp_low, warning_temp_high, critical_temp_low, critical_temp_high)
-            if predictive_status != "normal":
-                current_status = predictive_status
-
+        # If there are predicted values available, add them as a new trace to the Plotly graph
+        if not next_12predicted_values.empty:
+            fig.add_trace(
+                go.Scatter(
+                    x=next_12predicted_values["timestamp"],
+                    y=next_12predicted_values["predicted_value"],
+                    mode="lines",
+                    name="Predictions",
+                )
+            )
 
     
+    # Status Checking for sensor: the current value against the thresholds, then the forecast if that is normal
+    last_value = float(df['value'].iloc[-1]) if not df.empty else None
+    current_status = "normal"
+    if last_value is not None:
+        with metrics.stage('status'):
+            current_status = ThresholdEngine.from_config(config).sensor_status(last_value, next_12predicted_values['predicted_value'].to_numpy(dtype=float))
+
     # Serialize the plotly figure for rendering in the frontend
-    graphJSON = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    with metrics.stage('figure_json'):
+        graphJSON = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
     
     # Rename columns for both actual & predicted temp dataframes
     last_12actual_values.rename(columns={'timestamp': 'Timestamp', 'value': 'Value'}, inplace=True)
@@ -201,23 +381,64 @@ def home():
     next_12predicted_values['Value'] = next_12predicted_values['Value'].apply(lambda x: '{:.2f}'.format(x))
     
     # Convert data frames to HTML if they are not empty
-    last_12actual_values_html = last_12actual_values.to_html(classes="table", index=False) if not last_12actual_values.empty else ""
-    next_12predicted_values_html = next_12predicted_values.to_html(classes="table", index=False) if not next_12predicted_values.empty else ""
+    with metrics.stage('tables_to_html'):
+        last_12actual_values_html = last_12actual_values.to_html(classes="table", index=False) if not last_12actual_values.empty else ""
+        next_12predicted_values_html = next_12predicted_values.to_html(classes="table", index=False) if not next_12predicted_values.empty else ""
     print(f"Last value: {last_value}")
 
     # Render the main dashboard page with all components integrated
-    return render_template(
-        "index.html",
-        graphJSON=graphJSON,
-        last_12actual_values=last_12actual_values_html,
-        next_12predicted_values=next_12predicted_values_html,
-        warning_temp_low=warning_temp_low,
-        warning_temp_high=warning_temp_high,
-        critical_temp_low=critical_temp_low,
-        critical_temp_high=critical_temp_high,
-        current_status=current_status,
-    )
+    with metrics.stage('render_template'):
+        return render_template(
+            "index.html",
+            graphJSON=graphJSON,
+            last_12actual_values=last_12actual_values_html,
+            next_12predicted_values=next_12predicted_values_html,
+            warning_temp_low=warning_temp_low,
+            warning_temp_high=warning_temp_high,
+            critical_temp_low=critical_temp_low,
+            critical_temp_high=critical_temp_high,
+            current_status=current_status,
+            sensor=sensor,
+            sensors=SENSORS,
+            forecast_age_minutes=forecast_age_minutes,
+            forecast_input_age_minutes=forecast_input_age_minutes,
+            forecast_stale=forecast_stale,
+        )
     
+# /fleet page showing the status of every configured sensor
+@app.route("/fleet")
+def fleet():
+    if "username" not in session:
+        # Redirect to login if user is not logged in
+        return redirect(url_for("login"))
+
+    thresholds = ThresholdEngine.from_config(load_config())
+
+    # Refresh every sensor with one grouped Influx query
+    series = series_cache.refresh_many([sensor['measurement'] for sensor in SENSORS])
+
+    fleet_status = []
+    for sensor in SENSORS:
+        timestamps, values = series[sensor['measurement']]
+        forecast = forecast_scheduler.get(sensor['measurement'])
+        status = "default"
+        last_value = None
+        last_reading = None
+        if len(values):
+            last_value = float(values[-1])
+            last_reading = pd.Timestamp(int(timestamps[-1]), unit="ns", tz="UTC").strftime('%Y-%m-%d %H:%M')
+            # Same status rules as the dashboard: current thresholds first, then the forecast if currently normal
+            status = thresholds.sensor_status(last_value, forecast.values if forecast is not None else [])
+        fleet_status.append({
+            'sensor': sensor,
+            'status': status,
+            'last_value': last_value,
+            'last_reading': last_reading,
+            'forecast_age_minutes': int(forecast.age_seconds() // 60) if forecast is not None else None,
+        })
+
+    return render_template("fleet.html", fleet_status=fleet_status)
+
 # Start the Flask app
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,219 @@
+# Alert.py
+#Imports
+import os
+import json
+import threading
+from sendgrid import SendGridAPIClient
+from sendgrid.helpers.mail import Mail
+from twilio.rest import Client
+from datetime import datetime, timedelta
+from flask_wtf import FlaskForm
+from wtforms import StringField, FloatField, SubmitField
+from wtforms.validators import DataRequired, Email
+from dotenv import load_dotenv
+import numpy as np
+from components.ThresholdEngine import ThresholdEngine, NORMAL, CRITICAL
+from components.Metrics import metrics
+load_dotenv(override=True)
+
+
+# Twillio/sendgrid keys
+SENDGRID_API_KEY = os.environ.get('SENDGRID_API_KEY')
+TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
+TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
+
+# Config Path
+CONFIG_PATH = 'configs/Config.json'
+
+# Load configuration from JSON file
+def load_config():
+    try:
+        with metrics.stage('load_config'), open(CONFIG_PATH, 'r') as config_file:
+            return json.load(config_file)
+    except FileNotFoundError:
+        print("Configuration file not found", CONFIG_PATH)
+        return {}
+    except json.JSONDecodeError:
+        print("Error loading the JSON configuration file")
+        return {}
+
+# Save updated configuration to JSON file
+def save_config(config_data):
+    with open(CONFIG_PATH, 'w') as config_file:
+        json.dump(config_data, config_file, indent=4)
+
+# Shared API clients, created on first use and reused for every alert
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Function to get the shared SendGrid API client
+def get_sendgrid_client():
+    with _clients_lock:
+        if 'sendgrid' not in _clients:
+            _clients['sendgrid'] = SendGridAPIClient(SENDGRID_API_KEY)
+        return _clients['sendgrid']
+
+# Function to get the shared Twilio client (it keeps its HTTP session between calls)
+def get_twilio_client():
+    with _clients_lock:
+        if 'twilio' not in _clients:
+            _clients['twilio'] = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        return _clients['twilio']
+
+# Function to deliver an email using SendGrid, raising if sending fails so the caller can retry
+def deliver_email(to_email, subject, message):
+    # Create email message
+    email = Mail(
+        from_email='aaron.darcy@kelsius.com', 
+        to_emails=to_email, 
+        subject=subject, 
+        plain_text_content=message
+    )
+    # Send email
+    response = get_sendgrid_client().send(email)
+    print(f"Email sent with status code: {response.status_code}")
+    return response
+
+# Function to deliver an SMS using Twilio, raising if sending fails so the caller can retry
+def deliver_sms(to_phone, message):
+    # Send SMS
+    message = get_twilio_client().messages.create(
+        body=message, 
+        from_='+1234567890', 
+        to=to_phone
+    )
+    print(f"SMS sent; SID: {message.sid}")
+    return message
+
+# Function to send an email using SendGrid
+def send_email(to_email, subject, message):
+    try:
+        deliver_email(to_email, subject, message)
+    except Exception as e:
+        # Handle exceptions if email sending fails
+        print(f"Failed to send email: {e}")
+
+# Function to send an SMS using Twilio
+def send_sms(to_phone, message):
+    try:
+        deliver_sms(to_phone, message)
+    except Exception as e:
+        # Handle exceptions if SMS sending fails
+        print(f"Failed to send SMS: {e}")
+
+# Function to send both email and SMS alert
+def send_alert(email, phone_number, subject, message):
+    """Sends an email and an SMS alert."""
+    # Send email
+    send_email(email, subject, message)
+    # Send SMS
+    send_sms(phone_number, message)
+
+# Fcuntion to determine if an alert should be sent based on the time elapsed
+def should_send_alert(last_alert_time, current_time, alert_interval):
+    return (current_time - last_alert_time) >= timedelta(hours=alert_interval)
+
+# Fucntion to check temperature values against configured thresholds and alert if necessary
+def check_temperature_and_alert(value, current_time):
+    config = load_config()
+    email = config.get('EMAIL', 'default-email@example.com')
+    phone_number = config.get('PHONE_NUMBER', '+1234567890')
+    
+    # Define threshold conditions from config
+    conditions = {
+        'critical_low': config.get('CRITICAL_TEMP_LOW', float('inf')),
+        'critical_high': config.get('CRITICAL_TEMP_HIGH', float('inf')),
+        'warning_low': config.get('WARNING_TEMP_LOW', float('inf')),
+        'warning_high': config.get('WARNING_TEMP_HIGH', float('inf'))
+    }
+    
+    # Check if the value falls outside the critical range
+    alert_condition = None
+    if value < conditions['critical_low'] or value > conditions['critical_high']:
+        alert_condition = 'critical'
+    # Check if the value falls within the warning range
+    elif conditions['critical_low'] <= value < conditions['warning_low'] or conditions['warning_high'] < value <= conditions['critical_high']:
+        alert_condition = 'warning'
+
+    # If an alert condition is triggered
+    if alert_condition:
+        # Retrieve the last alert time from configuration, defaulting to a past date if not found
+        last_alert_time = datetime.strptime(config.get('last_alert_time', '1970-01-01 00:00:00'), '%Y-%m-%d %H:%M:%S')
+        # Check if an alert should be sent based on the time elapsed since the last alert
+        if should_send_alert(last_alert_time, current_time, 2):
+            # Compose alert message
+            alert_message = f'Temperature is {alert_condition}: {value}°C'
+            # Send alert via email
+            send_email(email, f'{alert_condition.title()}: Temperature Alert', alert_message)
+            # Send alert via SMS
+            send_sms(phone_number, alert_message)
+            # Update last alert time and condition in the configuration
+            config['last_alert_time'] = current_time.strftime('%Y-%m-%d %H:%M:%S')
+            config['last_alert_condition'] = alert_condition
+            # Save updated configuration
+            save_config(config)
+
+
+# Check predicted temperature values against configured thresholds and alert if necessary (only if actual value isn't in treshold)
+def alert_for_predicted_values(predicted_values_df, current_value, config, outbox=None, sensor=None):
+    """Alerts based on predicted values only if the current value is in a safe state.
+
+    If an AlertOutbox is given the alert is queued for background delivery instead of being sent inline.
+    """
+    thresholds = ThresholdEngine.from_config(config)
+
+    email = config.get('EMAIL', 'default-email@example.com')
+    phone_number = config.get('PHONE_NUMBER', '+1234567890')
+
+    # Only alert on predictions while the current value is normal (a warning or critical value is alerted on directly)
+    if thresholds.current_status(current_value) == 'normal':
+        # Classify all predicted values in one pass and alert once on the first one outside the normal band
+        predicted_values = predicted_values_df['predicted_value'].to_numpy(dtype=float)
+        levels = thresholds.classify(predicted_values)
+        outside = np.flatnonzero(levels > NORMAL)
+        if len(outside):
+            predicted_value = predicted_values[outside[0]]
+            if levels[outside[0]] == CRITICAL:
+                dispatch_alert(outbox, sensor, 'critical_predictive', email, phone_number,
+                               'Critical Temperature Prediction Alert',
+                               f'Sensor predicted to go into critical threshold ({predicted_value}°C) within the next hour.')
+            else:
+                dispatch_alert(outbox, sensor, 'warning_predictive', email, phone_number,
+                               'Warning Temperature Prediction Alert',
+                               f'Sensor predicted to go into warning threshold ({predicted_value}°C) within the next hour.')
+
+# Queue an alert in the outbox if there is one, otherwise send it straight away
+def dispatch_alert(outbox, sensor, severity, email, phone_number, subject, message):
+    if outbox is not None:
+        outbox.enqueue(sensor, severity, email, phone_number, subject, message)
+    else:
+        send_alert(email, phone_number, subject, message)
+            
+# Function to determine the status of the sensor based on the last recorded value
+def check_current_status(value, warning_low, warning_high, critical_low, critical_high):
+    return ThresholdEngine(warning_low, warning_high, critical_low, critical_high).current_status(value)
+
+# Function to determine the proactive status based on predicted values (first value outside the normal band)
+def check_proactive_status(predicted_values, warning_low, warning_high, critical_low, critical_high):
+    return ThresholdEngine(warning_low, warning_high, critical_low, critical_high).proactive_status(predicted_values)
+
+# Function to evaluate the status of the sensor based on historical and predicted data
+def evaluate_sensor_status(df, next_12predicted_values, config):
+    # Get the last recorded value from the dataframe
+    last_value = df['value'].iloc[-1] if not df.empty else float('inf')  # Use 'inf' if there is no data
+    # Extract predicted values from the next 12 hours
+    predicted_values = next_12predicted_values['predicted_value'].to_numpy(dtype=float) if not next_12predicted_values.empty else []
+    # Current status from the last recorded value, or the proactive status from the predictions if that is normal
+    return ThresholdEngine.from_config(config).sensor_status(last_value, predicted_values)
+
+
+# Define a Form for settings configuration
+class SettingsForm(FlaskForm):
+    warning_temp_low = FloatField('Warning Temperature Low', validators=[DataRequired()])
+    warning_temp_high = FloatField('Warning Temperature High', validators=[DataRequired()])
+    critical_temp_low = FloatField('Critical Temperature Low', validators=[DataRequired()])
+    critical_temp_high = FloatField('Critical Temperature High', validators=[DataRequired()])
+    email = StringField('Email', validators=[DataRequired(), Email()])
+    phone_number = StringField('Phone Number', validators=[DataRequired()])
+    submit = SubmitField('Save Settings')#
+
@@ -0,0 +1,187 @@
+# AlertOutbox.py
+# Imports
+import os
+import json
+import queue
+import threading
+from datetime import datetime
+from components.Alert import should_send_alert
+from components.Metrics import metrics
+
+# Time format used for the persisted alert times (same as last_alert_time in the config)
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+# Persistent outbox that merges repeated alerts per sensor and severity and delivers them from a worker pool
+class AlertOutbox:
+    def __init__(self, senders, path=None, cooldown_hours=2, workers=2, max_retries=5, backoff_seconds=2.0):
+        # senders maps a channel name to a callable(recipient, subject, message) that raises on failure
+        # e.g. {'email': deliver_email, 'sms': lambda to, subject, message: deliver_sms(to, message)}
+        self.senders = senders
+        # JSON file holding pending alerts and the last delivery time per sensor/severity, or None to keep them in memory
+        self.path = path
+        self.cooldown_hours = cooldown_hours
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._pending = {}
+        self._last_sent = {}
+        self.suppressed_count = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._load()
+
+    # Key used to merge alerts for the same sensor and severity
+    @staticmethod
+    def _key(sensor, severity):
+        return f"{sensor}|{severity}"
+
+    # Load pending alerts and last delivery times from disk and queue the pending ones again
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r') as outbox_file:
+                state = json.load(outbox_file)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            print("Error loading the JSON alert outbox", self.path)
+            return
+        self._last_sent = {key: datetime.strptime(value, TIME_FORMAT) for key, value in state.get('last_sent', {}).items()}
+        for alert in state.get('pending', []):
+            key = self._key(alert['sensor'], alert['severity'])
+            self._pending[key] = alert
+            self._queue.put(key)
+
+    # Write pending alerts and last delivery times to disk, called with the lock held
+    def _save(self):
+        if not self.path:
+            return
+        state = {
+            'pending': list(self._pending.values()),
+            'last_sent': {key: value.strftime(TIME_FORMAT) for key, value in self._last_sent.items()},
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as outbox_file:
+                json.dump(state, outbox_file, indent=4)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Failed to save alert outbox {self.path}: {e}")
+
+    # Queue an alert, merging it into a pending one for the same sensor/severity or dropping it within the cooldown
+    # Returns 'queued', 'merged' or 'suppressed'
+    def enqueue(self, sensor, severity, email, phone_number, subject, message, current_time=None):
+        current_time = current_time or datetime.now()
+        key = self._key(sensor, severity)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                # Keep the newest message and count how many alerts were merged into it
+                pending.update(subject=subject, message=message, email=email, phone_number=phone_number)
+                pending['count'] += 1
+                self._save()
+                metrics.inc('alerts_queued_total', result='merged')
+                return 'merged'
+
+            last_sent = self._last_sent.get(key)
+            if last_sent is not None and not should_send_alert(last_sent, current_time, self.cooldown_hours):
+                self.suppressed_count += 1
+                metrics.inc('alerts_queued_total', result='suppressed')
+                return 'suppressed'
+
+            self._pending[key] = {
+                'sensor': sensor,
+                'severity': severity,
+                'email': email,
+                'phone_number': phone_number,
+                'subject': subject,
+                'message': message,
+                'count': 1,
+                'created': current_time.strftime(TIME_FORMAT),
+                # Channels still to deliver, so a retry does not resend the ones that already succeeded
+                'channels': list(self.senders),
+            }
+            self._save()
+        self._queue.put(key)
+        metrics.inc('alerts_queued_total', result='queued')
+        return 'queued'
+
+    # Deliver one pending alert on every outstanding channel, retrying with exponential backoff
+    def deliver(self, key):
+        with self._lock:
+            alert = self._pending.get(key)
+            if alert is None:
+                return False
+            alert = dict(alert)
+
+        recipients = {'email': alert['email'], 'sms': alert['phone_number']}
+        remaining = list(alert['channels'])
+        for attempt in range(self.max_retries + 1):
+            for channel in list(remaining):
+                try:
+                    with metrics.stage(f'alert_send_{channel}'):
+                        self.senders[channel](recipients.get(channel), alert['subject'], alert['message'])
+                    remaining.remove(channel)
+                    metrics.inc('alerts_sent_total', channel=channel)
+                except Exception as e:
+                    metrics.inc('alert_send_failures_total', channel=channel)
+                    print(f"Failed to send {channel} alert for {key} (attempt {attempt + 1}): {e}")
+            if not remaining or attempt == self.max_retries:
+                break
+            with self._lock:
+                self._pending[key]['channels'] = list(remaining)
+                self._save()
+            if self._stop_event.wait(self.backoff_seconds * 2 ** attempt):
+                # Shutting down: leave the alert pending on disk so it is sent after a restart
+                return False
+
+        with self._lock:
+            if remaining:
+                # Give up on this alert after max_retries, the next one for this sensor/severity is not held back by the cooldown
+                print(f"Dropping {key} alert after {self.max_retries + 1} attempts on {remaining}")
+            else:
+                self._last_sent[key] = datetime.now()
+            self._pending.pop(key, None)
+            self._save()
+        return not remaining
+
+    # Worker loop draining the queue
+    def _worker(self):
+        while not self._stop_event.is_set():
+            try:
+                key = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                self.deliver(key)
+            finally:
+                self._queue.task_done()
+
+    # Start the worker threads
+    def start(self):
+        if self._threads:
+            return
+        self._stop_event.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"alert-outbox-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    # Stop the worker threads, pending alerts stay on disk
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # Number of alerts waiting to be delivered
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
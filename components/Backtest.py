@@ -0,0 +1,170 @@
+# Backtest.py
+# Imports
+import os
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from components.PredictionModel import PredictionModel
+from components.ThresholdEngine import ThresholdEngine
+
+# Fixture replayed when no other history is given
+DEFAULT_FIXTURE_PATH = 'data/backtest_history.csv'
+# Fixed alert thresholds for the fixture, so the gate does not depend on the live, editable configs/Config.json
+DEFAULT_THRESHOLDS_PATH = 'data/backtest_thresholds.json'
+
+
+# Generate a reproducible fridge-like temperature history with daily cycles, noise and door-open excursions
+def synthetic_history(days=4, seed=0, freq_minutes=5):
+    rng = np.random.default_rng(seed)
+    periods = days * 24 * 60 // freq_minutes
+    timestamps = pd.date_range(end=pd.Timestamp('2024-04-01', tz='UTC'), periods=periods, freq=f'{freq_minutes}min')
+    hours = np.arange(periods) * freq_minutes / 60
+    values = 4.0 + 1.5 * np.sin(2 * np.pi * hours / 24) + rng.normal(0, 0.2, periods)
+    # A few excursions ramping past the warning and critical thresholds and recovering
+    for start in rng.choice(np.arange(300, periods - 40), size=max(days, 1), replace=False):
+        values[start:start + 24] += np.concatenate((np.linspace(0, 5, 12), np.linspace(5, 0, 12)))
+    return timestamps, values
+
+
+# Load a temperature history from a CSV (timestamp,value) or a TimeSeriesCache .npz snapshot
+def load_history(path):
+    if path.endswith('.npz'):
+        with np.load(path) as snapshot:
+            return pd.to_datetime(snapshot['timestamps'], unit='ns', utc=True), snapshot['values'].astype(np.float64)
+    df = pd.read_csv(path, parse_dates=['timestamp']).sort_values(by='timestamp')
+    return pd.DatetimeIndex(df['timestamp']), df['value'].to_numpy(dtype=np.float64)
+
+
+# Load the alert thresholds to classify the backtest with from a JSON file using the Config.json keys
+def load_thresholds(path):
+    with open(path, 'r') as thresholds_file:
+        return json.load(thresholds_file)
+
+
+# Run every window through the model in batches of batch_size and return (N, prediction_steps) predictions
+def predict_windows(prediction_model, windows, batch_size=64):
+    predictions = [
+        prediction_model.predict_batch(windows[start:start + batch_size])
+        for start in range(0, len(windows), batch_size)
+    ]
+    return np.concatenate(predictions) if predictions else np.empty((0, prediction_model.prediction_steps))
+
+
+# Compare the predictive alerts raised from the forecasts with the ones the actual values would have raised
+def alert_accuracy(predictions, targets, config):
+    # Classify every window of predictions and actual values in one vectorised pass each
+    thresholds = ThresholdEngine.from_config(config)
+    predicted = thresholds.proactive_status(np.reshape(predictions, (len(predictions), -1)))
+    actual = thresholds.proactive_status(np.reshape(targets, (len(targets), -1)))
+
+    results = {}
+    for severity in ('warning_predictive', 'critical_predictive'):
+        hits = int(np.sum((predicted == severity) & (actual == severity)))
+        misses = int(np.sum((predicted != severity) & (actual == severity)))
+        false_alarms = int(np.sum((predicted == severity) & (actual != severity)))
+        results[severity] = {
+            'hits': hits,
+            'misses': misses,
+            'false_alarms': false_alarms,
+            'hit_rate': hits / (hits + misses) if hits + misses else None,
+            'false_alarm_rate': false_alarms / (hits + false_alarms) if hits + false_alarms else None,
+        }
+    return results
+
+
+# Replay a history through the model and report MAE/RMSE per horizon step and alert hit/miss rates
+def run_backtest(prediction_model, values, config, batch_size=64):
+    windows = prediction_model.create_sequences(values)
+    targets = prediction_model.create_targets(values)
+    predictions = predict_windows(prediction_model, windows, batch_size)
+    errors = predictions - targets
+    return {
+        'windows': int(len(windows)),
+        'mae_per_step': np.mean(np.abs(errors), axis=0).tolist(),
+        'rmse_per_step': np.sqrt(np.mean(errors ** 2, axis=0)).tolist(),
+        'mae': float(np.mean(np.abs(errors))),
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'alerts': alert_accuracy(predictions, targets, config),
+    }
+
+
+# Time inference at several batch sizes and report throughput and p50/p99 latency per window
+def run_benchmark(prediction_model, values, batch_sizes=(1, 8, 32, 128), repeats=20):
+    windows = prediction_model.create_sequences(values)
+    results = []
+    for batch_size in batch_sizes:
+        if len(windows) < batch_size:
+            continue
+        batch = windows[:batch_size]
+        # Warm up once so one-off allocation or graph tracing is not counted
+        prediction_model.predict_batch(batch)
+        latencies = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            prediction_model.predict_batch(batch)
+            latencies.append((time.perf_counter() - started) / batch_size)
+        latencies = np.array(latencies)
+        results.append({
+            'batch_size': batch_size,
+            'windows_per_second': float(1.0 / latencies.mean()),
+            'p50_ms': float(np.percentile(latencies, 50) * 1000),
+            'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        })
+    return results
+
+
+# Print the backtest and benchmark results as plain text tables
+def print_report(backtest, benchmark):
+    print(f"Backtest over {backtest['windows']} windows: MAE {backtest['mae']:.3f}, RMSE {backtest['rmse']:.3f}")
+    print("Step  MAE     RMSE")
+    for step, (mae, rmse) in enumerate(zip(backtest['mae_per_step'], backtest['rmse_per_step']), start=1):
+        print(f"{step:>4}  {mae:.3f}  {rmse:.3f}")
+    for severity, result in backtest['alerts'].items():
+        hit_rate = f"{result['hit_rate']:.2f}" if result['hit_rate'] is not None else '-'
+        print(f"{severity}: {result['hits']} hits, {result['misses']} misses, {result['false_alarms']} false alarms, hit rate {hit_rate}")
+    print("Batch  Windows/s  p50 ms  p99 ms")
+    for result in benchmark:
+        print(f"{result['batch_size']:>5}  {result['windows_per_second']:>9.1f}  {result['p50_ms']:>6.2f}  {result['p99_ms']:>6.2f}")
+
+
+# Command line entry point: python -m components.Backtest [--fixture path] [--max-mae X] [--min-throughput Y]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest the LSTM on a stored temperature history and benchmark inference.")
+    parser.add_argument('--fixture', default=DEFAULT_FIXTURE_PATH, help="CSV (timestamp,value) or cache .npz snapshot to replay")
+    parser.add_argument('--synthetic-days', type=int, help="Replay a generated history of this many days instead of a fixture")
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS_PATH, help="JSON file with the WARNING_/CRITICAL_TEMP_LOW/HIGH thresholds to score alerts against")
+    parser.add_argument('--model-path', default=os.environ.get('MODEL_PATH', 'models/LSTMModel/LSTMModelSaved'))
+    parser.add_argument('--weights-path', default=os.environ.get('MODEL_WEIGHTS_PATH', 'models/LSTMModel/LSTMModelWeights.npz'))
+    parser.add_argument('--backend', default=os.environ.get('MODEL_BACKEND', 'auto'))
+    parser.add_argument('--batch-sizes', default='1,8,32,128')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--json', dest='json_path', help="Also write the results to this JSON file")
+    parser.add_argument('--max-mae', type=float, help="Fail if the overall MAE is above this value")
+    parser.add_argument('--min-throughput', type=float, help="Fail if the best windows/s across batch sizes is below this value")
+    args = parser.parse_args()
+
+    if args.synthetic_days:
+        _, history = synthetic_history(args.synthetic_days)
+    else:
+        _, history = load_history(args.fixture)
+
+    prediction_model = PredictionModel(args.model_path, backend=args.backend, weights_path=args.weights_path)
+    backtest = run_backtest(prediction_model, history, load_thresholds(args.thresholds))
+    benchmark = run_benchmark(prediction_model, history, [int(size) for size in args.batch_sizes.split(',')], args.repeats)
+    print_report(backtest, benchmark)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as results_file:
+            json.dump({'backtest': backtest, 'benchmark': benchmark}, results_file, indent=4)
+
+    # Gate model and performance regressions
+    failures = []
+    if args.max_mae is not None and backtest['mae'] > args.max_mae:
+        failures.append(f"MAE {backtest['mae']:.3f} above {args.max_mae}")
+    best_throughput = max((result['windows_per_second'] for result in benchmark), default=0.0)
+    if args.min_throughput is not None and best_throughput < args.min_throughput:
+        failures.append(f"throughput {best_throughput:.1f} windows/s below {args.min_throughput}")
+    if failures:
+        raise SystemExit("Regression check failed: " + "; ".join(failures))
@@ -0,0 +1,61 @@
+# Downsample.py
+# Imports
+import base64
+import numpy as np
+
+
+# Function to pick the indices of a min/max downsampled series
+# Each bucket keeps both its lowest and highest reading, so excursions past the thresholds are never smoothed away
+def minmax_downsample(values, target_points):
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= target_points:
+        return np.arange(n)
+    # At least two buckets, so a tiny target still downsamples instead of returning the whole series
+    target_points = max(target_points, 4)
+
+    # Split the series into equally sized buckets, two points (min and max) per bucket
+    buckets = target_points // 2
+    size = -(-n // buckets)
+    rows = -(-n // size)
+    padded = np.full(rows * size, np.nan)
+    padded[:n] = values
+    padded = padded.reshape(rows, size)
+
+    # Vectorised argmin/argmax per bucket, converted back to positions in the original series
+    offsets = np.arange(rows) * size
+    lows = np.nanargmin(padded, axis=1) + offsets
+    highs = np.nanargmax(padded, axis=1) + offsets
+
+    # Keep time order within each bucket and always include the first and last points
+    indices = np.concatenate(([0], np.sort(np.stack((lows, highs), axis=1), axis=1).ravel(), [n - 1]))
+    return np.unique(indices)
+
+
+# Function to encode a numeric array as base64 little-endian bytes for compact JSON payloads
+def encode_array(array, dtype):
+    return base64.b64encode(np.ascontiguousarray(array, dtype=np.dtype(dtype).newbyteorder("<")).tobytes()).decode("ascii")
+
+
+# Function to build the /api/series payload for a window of cached readings
+def build_series_payload(timestamps, values, start=None, end=None, target_points=1000):
+    # Select the requested window (timestamps are int64 nanoseconds), keeping one point either side so lines reach the edges
+    lo = int(np.searchsorted(timestamps, start, side="left")) if start is not None else 0
+    hi = int(np.searchsorted(timestamps, end, side="right")) if end is not None else len(timestamps)
+    lo, hi = max(lo - 1, 0), min(hi + 1, len(timestamps))
+    window_timestamps = timestamps[lo:hi]
+    window_values = values[lo:hi]
+
+    indices = minmax_downsample(window_values, target_points)
+    # Plotly date axes accept epoch milliseconds, sent as float64 so no precision is lost; readings fit in float32
+    x = window_timestamps[indices] / 1e6
+    y = window_values[indices]
+    return {
+        "count": int(len(window_values)),
+        "points": int(len(indices)),
+        "encoding": "base64",
+        "x": encode_array(x, "float64"),
+        "x_dtype": "float64",
+        "y": encode_array(y, "float32"),
+        "y_dtype": "float32",
+    }
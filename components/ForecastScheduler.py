@@ -0,0 +1,141 @@
+# ForecastScheduler.py
+# Imports
+import threading
+import time
+import pandas as pd
+from components.Metrics import metrics
+
+
+# Holds the forecast computed for one measurement from the window ending at input_timestamp
+class Forecast:
+    def __init__(self, measurement, input_timestamp, last_value, timestamps, values):
+        self.measurement = measurement
+        # Timestamp of the last reading that went into the model input window
+        self.input_timestamp = input_timestamp
+        # Last actual reading, used for alerting against the forecast
+        self.last_value = last_value
+        self.timestamps = timestamps
+        self.values = values
+        self.computed_at = pd.Timestamp.now(tz="UTC")
+
+    # Age of the forecast in seconds since it was computed
+    def age_seconds(self, now=None):
+        now = now if now is not None else pd.Timestamp.now(tz="UTC")
+        return (now - self.computed_at).total_seconds()
+
+    # Age of the newest reading the forecast is based on, in seconds
+    def input_age_seconds(self, now=None):
+        now = now if now is not None else pd.Timestamp.now(tz="UTC")
+        return (now - self.input_timestamp).total_seconds()
+
+    # Predicted values as the DataFrame shape the dashboard and alerts expect
+    def to_dataframe(self):
+        return pd.DataFrame({"timestamp": self.timestamps, "predicted_value": self.values})
+
+
+# Background scheduler that runs the LSTM once per new sensor reading and stores the result per measurement
+class ForecastScheduler:
+    def __init__(self, series_cache, prediction_model, interval=60, on_forecast=None, on_update=None):
+        self.series_cache = series_cache
+        self.prediction_model = prediction_model
+        # Number of seconds between checks for new readings
+        self.interval = interval
+        # Optional callback run with each new Forecast (e.g. for alerting)
+        self.on_forecast = on_forecast
+        # Optional callback run after every poll with the cached series and current forecasts per measurement (e.g. live updates)
+        self.on_update = on_update
+        self.measurements = []
+        self._forecasts = {}
+        # Only one inference runs at a time, whether triggered by the thread or by run_once
+        self._inference_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # Register a measurement to be forecast
+    def add_measurement(self, measurement):
+        if measurement not in self.measurements:
+            self.measurements.append(measurement)
+
+    # Return the stored forecast for a measurement, or None if none has been computed yet
+    def get(self, measurement):
+        return self._forecasts.get(measurement)
+
+    # Compute a new forecast for a measurement if a new reading has arrived since the last one
+    def update(self, measurement):
+        return self.update_many([measurement]).get(measurement)
+
+    # Refresh several measurements in one Influx round trip and forecast every one with a new reading in one model call
+    def update_many(self, measurements):
+        series = self.series_cache.refresh_many(measurements)
+        sequence_length = self.prediction_model.sequence_length
+
+        with self._inference_lock:
+            forecasts = {}
+            pending = []
+            for measurement, (timestamps, values) in series.items():
+                if len(values) < sequence_length:
+                    continue
+                input_timestamp = pd.Timestamp(int(timestamps[-1]), unit="ns", tz="UTC")
+                existing = self._forecasts.get(measurement)
+                if existing is not None and existing.input_timestamp == input_timestamp:
+                    forecasts[measurement] = existing
+                else:
+                    pending.append((measurement, input_timestamp, values))
+
+            new_forecasts = []
+            if pending:
+                # Normalisation, inference and inverse scaling all run once over the (N, sequence_length, 1) batch
+                with metrics.stage('inference'):
+                    predictions = self.prediction_model.predict_batch([values for _, _, values in pending])
+                metrics.inc('inference_calls_total')
+                metrics.inc('inference_windows_total', len(pending))
+                for (measurement, input_timestamp, values), sensor_predictions in zip(pending, predictions):
+                    # Predicted values are 5 minutes apart, starting 5 minutes after the last reading
+                    prediction_intervals = pd.date_range(start=input_timestamp + pd.Timedelta(minutes=5), periods=len(sensor_predictions), freq="5min")
+                    forecast = Forecast(measurement, input_timestamp, float(values[-1]), prediction_intervals, sensor_predictions)
+                    self._forecasts[measurement] = forecast
+                    forecasts[measurement] = forecast
+                    new_forecasts.append(forecast)
+
+        if self.on_forecast is not None:
+            for forecast in new_forecasts:
+                try:
+                    self.on_forecast(forecast)
+                except Exception as e:
+                    print(f"Forecast callback failed for {forecast.measurement}: {e}")
+        if self.on_update is not None:
+            try:
+                with metrics.stage('live_update_publish'):
+                    self.on_update(series, forecasts)
+            except Exception as e:
+                print(f"Update callback failed: {e}")
+        return forecasts
+
+    # Check every registered measurement once
+    def run_once(self):
+        try:
+            self.update_many(list(self.measurements))
+        except Exception as e:
+            # Keep the scheduler alive if Influx or the model fails
+            print(f"Failed to update forecasts: {e}")
+
+    # Thread loop checking for new readings every interval seconds
+    def _run(self):
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            self.run_once()
+            self._stop_event.wait(max(self.interval - (time.monotonic() - started), 0))
+
+    # Start the background thread
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="forecast-scheduler", daemon=True)
+        self._thread.start()
+
+    # Stop the background thread
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
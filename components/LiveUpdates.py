@@ -0,0 +1,215 @@
+# LiveUpdates.py
+# Imports
+import json
+import queue
+import threading
+import numpy as np
+import pandas as pd
+from components.ThresholdEngine import summarise_excursions
+
+# Queued to a dropped client's queue so its stream ends and EventSource reconnects
+CLOSE = object()
+
+
+# Publishes new readings, forecasts and status changes to connected dashboards as small Server-Sent Event deltas
+# It is fed by the forecast scheduler's poll, so connected clients never cause extra InfluxDB queries
+class LiveUpdates:
+    def __init__(self, sensors, load_thresholds, max_queue_size=100, max_readings=288, table_rows=12, excursion_limit=10, max_streams=None):
+        # Sensors as configured in Sensors.json, used to map measurements to the ids clients subscribe with
+        self.sensor_ids = {sensor['measurement']: sensor['id'] for sensor in sensors}
+        # Callable returning the ThresholdEngine to evaluate the status with (so settings changes are picked up)
+        self.load_thresholds = load_thresholds
+        self.max_queue_size = max_queue_size
+        # Most readings sent in one event, e.g. after a long gap
+        self.max_readings = max_readings
+        # Rows of the actual readings table and excursions sent when a client (re)connects
+        self.table_rows = table_rows
+        self.excursion_limit = excursion_limit
+        # Most streams open at once (each holds a server thread while connected), or None for no limit
+        self.max_streams = max_streams
+        self._subscribers = {}
+        self._last_reading = {}
+        self._last_forecast = {}
+        self._last_status = {}
+        self._last_excursions = {}
+        # Latest series and event data per sensor, replayed to clients when they connect
+        self._series = {}
+        self._state = {}
+        self._event_id = 0
+        self._lock = threading.Lock()
+
+    # Register a client for one sensor and return the queue its events are delivered to, or None if max_streams are open
+    def subscribe(self, sensor_id):
+        subscriber = queue.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            open_streams = sum(len(subscribers) for subscribers in self._subscribers.values())
+            if self.max_streams is not None and open_streams >= self.max_streams:
+                return None
+            self._subscribers.setdefault(sensor_id, set()).add(subscriber)
+        return subscriber
+
+    # Remove a client
+    def unsubscribe(self, sensor_id, subscriber):
+        with self._lock:
+            self._subscribers.get(sensor_id, set()).discard(subscriber)
+
+    # Number of connected clients
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    # Format an event once so every subscriber gets the same pre-encoded message
+    def _publish(self, sensor_id, event, data):
+        with self._lock:
+            self._event_id += 1
+            message = f"id: {self._event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+            subscribers = list(self._subscribers.get(sensor_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # A client that stopped reading is dropped and its stream closed, EventSource then reconnects
+                # and the new stream starts with the current state
+                self.unsubscribe(sensor_id, subscriber)
+                self._close(subscriber)
+
+    # Replace whatever a dropped client has not read yet with the close sentinel
+    @staticmethod
+    def _close(subscriber):
+        while True:
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                break
+        try:
+            subscriber.put_nowait(CLOSE)
+        except queue.Full:
+            pass
+
+    # Remember the latest data of an event for the connect snapshot and publish it
+    def _publish_state(self, sensor_id, event, data):
+        with self._lock:
+            self._state.setdefault(sensor_id, {})[event] = data
+        self._publish(sensor_id, event, data)
+
+    # Current state of a sensor as (event, data) pairs: the latest readings (replacing the table), forecast, status and
+    # excursions, sent to clients when they connect and returned to clients polling instead of streaming
+    def snapshot_events(self, sensor_id):
+        with self._lock:
+            series = self._series.get(sensor_id)
+            state = dict(self._state.get(sensor_id, {}))
+        events = []
+        if series is not None:
+            timestamps, values = series
+            events.append(('readings', dict(self._readings(sensor_id, timestamps, values, len(timestamps) - self.table_rows), reset=True)))
+        events.extend((event, state[event]) for event in ('forecast', 'status', 'excursions') if event in state)
+        return events
+
+    # Snapshot messages bringing a newly connected client up to date, so nothing published while it was disconnected is lost
+    def snapshot(self, sensor_id):
+        messages = []
+        for event, data in self.snapshot_events(sensor_id):
+            with self._lock:
+                self._event_id += 1
+                event_id = self._event_id
+            messages.append(f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n")
+        return messages
+
+    # Readings event data for the points from position start on
+    @staticmethod
+    def _readings(sensor_id, timestamps, values, start):
+        start = max(start, 0)
+        return {
+            'sensor': sensor_id,
+            'x': (timestamps[start:] // 1_000_000).tolist(),
+            'y': values[start:].tolist(),
+            'labels': pd.to_datetime(timestamps[start:], unit='ns', utc=True).strftime('%Y-%m-%d %H:%M').tolist(),
+        }
+
+    # Called by the forecast scheduler after each poll with the cached series and current forecasts per measurement
+    def publish_update(self, series, forecasts):
+        thresholds = self.load_thresholds()
+        for measurement, (timestamps, values) in series.items():
+            sensor_id = self.sensor_ids.get(measurement, measurement)
+            if not len(timestamps):
+                continue
+            # The cache replaces its arrays rather than modifying them, so keeping a reference is safe
+            with self._lock:
+                self._series[sensor_id] = (timestamps, values)
+
+            # New readings since the last push (the first poll only records the position, pages already have the history)
+            last_reading = self._last_reading.get(measurement)
+            if last_reading is not None and timestamps[-1] > last_reading:
+                start = max(int(np.searchsorted(timestamps, last_reading, side='right')), len(timestamps) - self.max_readings)
+                self._publish(sensor_id, 'readings', self._readings(sensor_id, timestamps, values, start))
+            self._last_reading[measurement] = int(timestamps[-1])
+
+            # Excursion analytics, computed once here for every connected dashboard when a reading arrives or the thresholds change
+            excursions_key = (int(timestamps[-1]), len(timestamps), thresholds.key())
+            if self._last_excursions.get(measurement) != excursions_key:
+                self._last_excursions[measurement] = excursions_key
+                analytics = thresholds.excursion_analytics(timestamps, values)
+                self._publish_state(sensor_id, 'excursions', dict(summarise_excursions(analytics, self.excursion_limit), sensor=sensor_id))
+
+            # Updated forecast
+            forecast = forecasts.get(measurement)
+            if forecast is not None and self._last_forecast.get(measurement) != forecast.input_timestamp:
+                self._last_forecast[measurement] = forecast.input_timestamp
+                self._publish_state(sensor_id, 'forecast', {
+                    'sensor': sensor_id,
+                    'x': (forecast.timestamps.asi8 // 1_000_000).tolist(),
+                    'y': np.asarray(forecast.values, dtype=float).tolist(),
+                    'labels': forecast.timestamps.strftime('%Y-%m-%d %H:%M').tolist(),
+                    'input_age_minutes': int(forecast.input_age_seconds() // 60),
+                })
+
+            # Status change
+            status = thresholds.sensor_status(float(values[-1]), forecast.values if forecast is not None else [])
+            if self._last_status.get(measurement) != status:
+                self._last_status[measurement] = status
+                self._publish_state(sensor_id, 'status', {'sensor': sensor_id, 'status': status})
+
+    # Open a stream of SSE messages for one client, or return None when max_streams are already open
+    # It starts with the current state, sends a comment line as keepalive so proxies keep the connection open
+    # and ends when the client is dropped for falling behind
+    def stream(self, sensor_id, keepalive_seconds=15):
+        subscriber = self.subscribe(sensor_id)
+        if subscriber is None:
+            return None
+        return LiveStream(self._events(sensor_id, subscriber, keepalive_seconds), lambda: self.unsubscribe(sensor_id, subscriber))
+
+    def _events(self, sensor_id, subscriber, keepalive_seconds):
+        try:
+            yield "retry: 5000\n\n"
+            # Subscribed first, so nothing is missed between the snapshot and the first event (clients skip repeated readings)
+            for message in self.snapshot(sensor_id):
+                yield message
+            while True:
+                try:
+                    message = subscriber.get(timeout=keepalive_seconds)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is CLOSE:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(sensor_id, subscriber)
+
+
+# Iterator over one client's SSE messages whose close() also frees its slot when the stream was never read,
+# e.g. a client disconnecting before the server started sending (closing an unstarted generator skips its finally)
+class LiveStream:
+    def __init__(self, events, unsubscribe):
+        self._events = events
+        self._unsubscribe = unsubscribe
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._events)
+
+    def close(self):
+        self._events.close()
+        self._unsubscribe()
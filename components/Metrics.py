@@ -0,0 +1,125 @@
+# Metrics.py
+# Imports
+import time
+import threading
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Type and help text of the metrics exposed on /metrics
+METRIC_HELP = {
+    'stage_duration_seconds': ('histogram', 'Time spent in each stage of the dashboard, forecast and alert pipeline.'),
+    'http_request_duration_seconds': ('histogram', 'Time spent handling each request, by endpoint.'),
+    'influx_queries_total': ('counter', 'Number of queries sent to InfluxDB.'),
+    'influx_query_failures_total': ('counter', 'Number of InfluxDB queries that failed, after which cached data was served.'),
+    'influx_points_fetched_total': ('counter', 'Number of points returned by InfluxDB queries.'),
+    'cache_requests_total': ('counter', 'Cache lookups by cache and result (hit or miss).'),
+    'inference_calls_total': ('counter', 'Number of model inference calls.'),
+    'inference_windows_total': ('counter', 'Number of input windows run through the model.'),
+    'alerts_queued_total': ('counter', 'Alerts added to the outbox, by result (queued, merged or suppressed).'),
+    'alerts_sent_total': ('counter', 'Alerts delivered, by channel.'),
+    'alert_send_failures_total': ('counter', 'Failed alert delivery attempts, by channel.'),
+}
+
+
+# Cumulative histogram of observed values
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+# Registry of counters and histograms, rendered in the Prometheus text format
+class MetricsRegistry:
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        # Stage timings of the current request when profiling is on, per thread
+        self._local = threading.local()
+
+    # Increase a counter, e.g. inc('alerts_sent_total', channel='email')
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    # Record a value in a histogram
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(value)
+
+    # Time a block of code as a stage, e.g. with metrics.stage('influx_query'): ...
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started
+            self.observe('stage_duration_seconds', duration, stage=name)
+            profile = getattr(self._local, 'profile', None)
+            if profile is not None:
+                profile.append((name, duration))
+
+    # Start collecting the stage timings of the current thread (one request)
+    def start_profile(self):
+        self._local.profile = []
+
+    # Stop collecting and return the (stage, seconds) timings recorded since start_profile
+    def stop_profile(self):
+        profile = getattr(self._local, 'profile', None)
+        self._local.profile = None
+        return profile or []
+
+    # Render every metric in the Prometheus text exposition format
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(h.buckets), list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described:
+                described.add(name)
+                metric_type, help_text = METRIC_HELP.get(name, ('untyped', ''))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+
+        def format_labels(labels):
+            if not labels:
+                return ''
+            return '{' + ','.join(f'{key}="{str(value)}"' for key, value in labels) + '}'
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name)
+            lines.append(f"{name}{format_labels(labels)} {value}")
+
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            describe(name)
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {bucket_count}")
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+        return '\n'.join(lines) + '\n'
+
+
+# Shared registry used by the app and its components
+metrics = MetricsRegistry()
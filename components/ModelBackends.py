@@ -0,0 +1,165 @@
+# ModelBackends.py
+# Imports
+import os
+import argparse
+import numpy as np
+
+# Expected (name, shape) of the weights exported from the saved LSTM model, in Keras variable order
+# The architecture is LSTM(224, return_sequences) -> LSTM(224) -> Dense(80, relu) -> Dense(12)
+WEIGHT_NAMES = [
+    'lstm_kernel', 'lstm_recurrent_kernel', 'lstm_bias',
+    'lstm_1_kernel', 'lstm_1_recurrent_kernel', 'lstm_1_bias',
+    'dense_kernel', 'dense_bias',
+    'dense_1_kernel', 'dense_1_bias',
+]
+
+
+# Numerically stable logistic sigmoid
+def sigmoid(x):
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+# Runs a Keras LSTM layer (gate order i, f, c, o) over a (N, T, features) batch
+def lstm_forward(inputs, kernel, recurrent_kernel, bias, return_sequences=False):
+    batch_size, timesteps, _ = inputs.shape
+    units = recurrent_kernel.shape[0]
+    # Project the whole input sequence at once, only the recurrent part has to run step by step
+    projected = inputs @ kernel + bias
+    h = np.zeros((batch_size, units), dtype=inputs.dtype)
+    c = np.zeros((batch_size, units), dtype=inputs.dtype)
+    outputs = np.empty((batch_size, timesteps, units), dtype=inputs.dtype) if return_sequences else None
+    for t in range(timesteps):
+        z = projected[:, t, :] + h @ recurrent_kernel
+        i = sigmoid(z[:, :units])
+        f = sigmoid(z[:, units:2 * units])
+        g = np.tanh(z[:, 2 * units:3 * units])
+        o = sigmoid(z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * np.tanh(c)
+        if return_sequences:
+            outputs[:, t, :] = h
+    return outputs if return_sequences else h
+
+
+# Backend running the LSTM forward pass in NumPy from exported weights, no TensorFlow needed
+class NumpyLSTMBackend:
+    name = 'numpy'
+
+    def __init__(self, weights_path):
+        with np.load(weights_path) as weights:
+            self.weights = {name: weights[name].astype(np.float32) for name in WEIGHT_NAMES}
+
+    # Function to run the model on a normalized (N, sequence_length, 1) batch, returns normalized (N, steps) predictions
+    def infer(self, batch):
+        w = self.weights
+        x = np.asarray(batch, dtype=np.float32)
+        x = lstm_forward(x, w['lstm_kernel'], w['lstm_recurrent_kernel'], w['lstm_bias'], return_sequences=True)
+        x = lstm_forward(x, w['lstm_1_kernel'], w['lstm_1_recurrent_kernel'], w['lstm_1_bias'])
+        x = np.maximum(x @ w['dense_kernel'] + w['dense_bias'], 0.0)
+        return x @ w['dense_1_kernel'] + w['dense_1_bias']
+
+
+# Backend running the TensorFlow SavedModel, TensorFlow is only imported when this backend is selected
+class TensorFlowBackend:
+    name = 'tensorflow'
+
+    def __init__(self, model_path):
+        import tensorflow as tf
+        # Setting CUDA devices to not use GPU
+        os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+        tf.config.set_visible_devices([], 'GPU')
+        self.tf = tf
+        # Load TensorFlow model from specified path and retrieve the inference function
+        self.model = tf.saved_model.load(model_path)
+        self.infer_fn = self.model.signatures['serving_default']
+
+    # Function to run the model on a normalized (N, sequence_length, 1) batch, returns normalized (N, steps) predictions
+    def infer(self, batch):
+        return self.infer_fn(self.tf.constant(batch, dtype=self.tf.float32))['dense_1'].numpy()
+
+
+# Checkpoint key of each weight in the SavedModel: Keras tracks the LSTM cell weights as the model's variables/0 ... 5,
+# while the Dense layers are saved under the layers that own them
+CHECKPOINT_KEYS = {
+    'lstm_kernel': 'variables/0',
+    'lstm_recurrent_kernel': 'variables/1',
+    'lstm_bias': 'variables/2',
+    'lstm_1_kernel': 'variables/3',
+    'lstm_1_recurrent_kernel': 'variables/4',
+    'lstm_1_bias': 'variables/5',
+    'dense_kernel': 'layer_with_weights-2/kernel',
+    'dense_bias': 'layer_with_weights-2/bias',
+    'dense_1_kernel': 'layer_with_weights-3/kernel',
+    'dense_1_bias': 'layer_with_weights-3/bias',
+}
+
+
+# Check the exported weights chain into each other: input -> LSTM -> LSTM -> Dense -> Dense
+def check_weight_shapes(weights):
+    units = weights['lstm_recurrent_kernel'].shape[0]
+    units_1 = weights['lstm_1_recurrent_kernel'].shape[0]
+    expected = {
+        'lstm_kernel': (1, 4 * units),
+        'lstm_recurrent_kernel': (units, 4 * units),
+        'lstm_bias': (4 * units,),
+        'lstm_1_kernel': (units, 4 * units_1),
+        'lstm_1_recurrent_kernel': (units_1, 4 * units_1),
+        'lstm_1_bias': (4 * units_1,),
+        'dense_kernel': (units_1, weights['dense_bias'].shape[0]),
+        'dense_1_kernel': (weights['dense_bias'].shape[0], weights['dense_1_bias'].shape[0]),
+    }
+    for name, shape in expected.items():
+        if weights[name].shape != shape:
+            raise ValueError(f"Unexpected shape {weights[name].shape} for {name}, expected {shape}")
+
+
+# Export the weights of the SavedModel to a .npz file for the NumPy backend (requires TensorFlow)
+def export_numpy_weights(model_path, weights_path):
+    import tensorflow as tf
+    reader = tf.train.load_checkpoint(os.path.join(model_path, 'variables', 'variables'))
+    available = reader.get_variable_to_shape_map()
+    keys = {name: f"{key}/.ATTRIBUTES/VARIABLE_VALUE" for name, key in CHECKPOINT_KEYS.items()}
+    missing = [key for key in keys.values() if key not in available]
+    if missing:
+        raise ValueError(f"Model variables {missing} not found in {model_path}")
+    weights = {name: reader.get_tensor(key) for name, key in keys.items()}
+    check_weight_shapes(weights)
+    np.savez(weights_path, **weights)
+    return weights
+
+
+# Run both backends on the same random windows and return the largest absolute difference in normalized output
+def check_backend_parity(model_path, weights_path, batch_size=8, sequence_length=288, seed=0):
+    windows = np.random.default_rng(seed).random((batch_size, sequence_length, 1), dtype=np.float32)
+    numpy_predictions = NumpyLSTMBackend(weights_path).infer(windows)
+    tensorflow_predictions = TensorFlowBackend(model_path).infer(windows)
+    return float(np.max(np.abs(numpy_predictions - tensorflow_predictions)))
+
+
+# Create the backend selected by name ('numpy', 'tensorflow' or 'auto' to prefer NumPy when weights are exported)
+def create_backend(backend, model_path, weights_path):
+    if backend == 'auto':
+        backend = 'numpy' if weights_path and os.path.exists(weights_path) else 'tensorflow'
+    if backend == 'numpy':
+        return NumpyLSTMBackend(weights_path)
+    if backend == 'tensorflow':
+        return TensorFlowBackend(model_path)
+    raise ValueError(f"Unknown model backend: {backend}")
+
+
+# Command line entry point: python -m components.ModelBackends export|parity
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export LSTM weights for the NumPy backend or check it against TensorFlow.")
+    parser.add_argument('command', choices=['export', 'parity'])
+    parser.add_argument('--model-path', default=os.environ.get('MODEL_PATH', 'models/LSTMModel/LSTMModelSaved'))
+    parser.add_argument('--weights-path', default=os.environ.get('MODEL_WEIGHTS_PATH', 'models/LSTMModel/LSTMModelWeights.npz'))
+    parser.add_argument('--tolerance', type=float, default=1e-4)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_numpy_weights(args.model_path, args.weights_path)
+        print(f"Exported weights to {args.weights_path}")
+    max_difference = check_backend_parity(args.model_path, args.weights_path)
+    print(f"Max absolute difference between NumPy and TensorFlow backends: {max_difference:.2e}")
+    if max_difference > args.tolerance:
+        raise SystemExit(f"Parity check failed (tolerance {args.tolerance})")
@@ -0,0 +1,75 @@
+# Prediction.py
+# Imports
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from components.ModelBackends import create_backend
+
+# Min-max scaler for a single feature, equivalent to sklearn's MinMaxScaler fitted on [min_val, max_val]
+class MinMaxScaler:
+    def __init__(self, min_val, max_val):
+        self.min_val = min_val
+        self.scale = 1.0 / (max_val - min_val)
+
+    def transform(self, data):
+        return (np.asarray(data, dtype=np.float64) - self.min_val) * self.scale
+
+    def inverse_transform(self, data):
+        return np.asarray(data, dtype=np.float64) / self.scale + self.min_val
+
+# Prediction Model Class
+class PredictionModel:
+    def __init__(self, MODEL_PATH, sequence_length=288, prediction_steps=12, min_val=-85.199997, max_val=38.400000, backend='auto', weights_path=None):
+        # Load the selected inference backend ('numpy' uses exported weights, 'tensorflow' the SavedModel, 'auto' prefers numpy)
+        self.backend = create_backend(backend, MODEL_PATH, weights_path)
+        # Set up model parameters
+        self.sequence_length = sequence_length
+        self.prediction_steps = prediction_steps
+        # Initialize scaler with the min and max values from training for normalization
+        self.scaler = MinMaxScaler(min_val, max_val)
+    
+    # Function to normalize Sensor data as the model was trained using normalized values
+    def normalize(self, data):
+        # Reshape data for scaling
+        if isinstance(data, pd.Series):
+            data = data.values.reshape(-1, 1)
+        elif isinstance(data, np.ndarray):
+            data = data.reshape(-1, 1)
+        return self.scaler.transform(data)
+    
+    # Function to create sequences from the sensor data for prediction
+    def create_sequences(self, data):
+        # Generate data sequences for model input as a zero-copy sliding window view over the data
+        data = np.asarray(data)
+        count = len(data) - self.sequence_length - self.prediction_steps + 1
+        if count <= 0:
+            return np.empty((0, self.sequence_length) + data.shape[1:], dtype=data.dtype)
+        # The window axis is added last by sliding_window_view, move it next to the sequence axis for (N, sequence_length, ...)
+        return np.moveaxis(sliding_window_view(data, self.sequence_length, axis=0)[:count], -1, 1)
+
+    # Function to create the prediction_steps actual values following each sequence from create_sequences
+    def create_targets(self, data):
+        data = np.asarray(data)
+        count = len(data) - self.sequence_length - self.prediction_steps + 1
+        if count <= 0:
+            return np.empty((0, self.prediction_steps) + data.shape[1:], dtype=data.dtype)
+        return np.moveaxis(sliding_window_view(data[self.sequence_length:], self.prediction_steps, axis=0)[:count], -1, 1)
+
+    # Function to predict using the selected backend on reshaped input data
+    def predict(self, reshaped_input):
+        # Make predictions and transform the results back to the original scale
+        predictions_normalized = self.backend.infer(reshaped_input)
+        predictions = self.scaler.inverse_transform(predictions_normalized)
+        # Print predictions for debugging and verification
+        print(f"Predictions generated: {predictions.flatten()}")  
+        return predictions.flatten()
+
+    # Function to predict for several sensors at once from their raw (unnormalized) input windows
+    def predict_batch(self, windows):
+        # Stack the last sequence_length values of every window into one (N, sequence_length, 1) batch
+        batch = np.stack([np.asarray(window, dtype=np.float64)[-self.sequence_length:] for window in windows])
+        # Normalize and inverse scale the whole batch in one call each, the scaler works on a single feature column
+        normalized_batch = self.scaler.transform(batch.reshape(-1, 1)).reshape(len(batch), self.sequence_length, 1)
+        predictions_normalized = self.backend.infer(normalized_batch)
+        predictions = self.scaler.inverse_transform(predictions_normalized.reshape(-1, 1)).reshape(len(batch), -1)
+        return predictions
\ No newline at end of file
@@ -0,0 +1,40 @@
+# Sensors.py
+# Imports
+import json
+
+# Sensors Path
+SENSORS_PATH = 'configs/Sensors.json'
+
+# Sensor used when no sensors file is available
+DEFAULT_SENSORS = [
+    {
+        'id': 'ruuvitag-e2c4f3',
+        'name': 'RuuviTag E2C4F3',
+        'measurement': 'B0A732FFFFF1A160_BLE_0_0_0_E2C4F3FFFF199E64_RuuviTag_0_Temperature',
+    },
+]
+
+# Load the list of monitored sensors from JSON file
+def load_sensors():
+    try:
+        with open(SENSORS_PATH, 'r') as sensors_file:
+            sensors = json.load(sensors_file)
+    except FileNotFoundError:
+        print("Sensors file not found", SENSORS_PATH)
+        return list(DEFAULT_SENSORS)
+    except json.JSONDecodeError:
+        print("Error loading the JSON sensors file")
+        return list(DEFAULT_SENSORS)
+
+    # Fill in missing ids/names from the measurement so every sensor can be addressed in URLs
+    for sensor in sensors:
+        sensor.setdefault('id', sensor['measurement'])
+        sensor.setdefault('name', sensor['id'])
+    return sensors or list(DEFAULT_SENSORS)
+
+# Find a sensor by id, falling back to the first sensor if the id is unknown or missing
+def find_sensor(sensors, sensor_id):
+    for sensor in sensors:
+        if sensor['id'] == sensor_id:
+            return sensor
+    return sensors[0]
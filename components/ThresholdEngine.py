@@ -0,0 +1,132 @@
+# ThresholdEngine.py
+# Imports
+import numpy as np
+
+# Band levels returned by classify
+NORMAL = 0
+WARNING = 1
+CRITICAL = 2
+BAND_NAMES = ['normal', 'warning', 'critical']
+
+
+# Classifies whole arrays of actual and predicted values against the warning and critical bands in one pass
+class ThresholdEngine:
+    def __init__(self, warning_low, warning_high, critical_low, critical_high):
+        self.warning_low = float(warning_low)
+        self.warning_high = float(warning_high)
+        self.critical_low = float(critical_low)
+        self.critical_high = float(critical_high)
+
+    # Build the engine from the thresholds in the JSON config
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config.get('WARNING_TEMP_LOW', float('inf')),
+            config.get('WARNING_TEMP_HIGH', float('inf')),
+            config.get('CRITICAL_TEMP_LOW', float('inf')),
+            config.get('CRITICAL_TEMP_HIGH', float('inf')),
+        )
+
+    # Thresholds as a tuple, e.g. for use as a cache key
+    def key(self):
+        return (self.warning_low, self.warning_high, self.critical_low, self.critical_high)
+
+    # Classify every value (any shape) as NORMAL, WARNING or CRITICAL
+    def classify(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        critical = (values < self.critical_low) | (values > self.critical_high)
+        warning = (values < self.warning_low) | (values > self.warning_high)
+        return np.where(critical, CRITICAL, np.where(warning, WARNING, NORMAL)).astype(np.int8)
+
+    # Status of the current value: 'normal', 'warning' or 'critical'
+    def current_status(self, value):
+        return BAND_NAMES[int(self.classify(value))]
+
+    # Proactive status of each row of predictions: the band of the first predicted value outside the normal range
+    # Returns 'normal', 'warning_predictive' or 'critical_predictive' for 1-D input, or an array of them per row for 2-D input
+    def proactive_status(self, predicted_values):
+        levels = np.atleast_2d(self.classify(predicted_values))
+        if levels.shape[1] == 0:
+            first_level = np.zeros(levels.shape[0], dtype=np.int8)
+        else:
+            first_level = levels[np.arange(levels.shape[0]), np.argmax(levels > NORMAL, axis=1)]
+        names = np.array(['normal', 'warning_predictive', 'critical_predictive'])[first_level]
+        return str(names[0]) if np.ndim(predicted_values) <= 1 else names
+
+    # Overall sensor status: the current band if it is not normal, otherwise the proactive status of the predictions
+    def sensor_status(self, current_value, predicted_values):
+        if current_value is None:
+            return 'default'
+        status = self.current_status(current_value)
+        if status == 'normal':
+            status = self.proactive_status(predicted_values)
+        return status
+
+    # Distance of each value outside the warning band (0 inside it)
+    def deviation(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        return np.maximum(np.maximum(values - self.warning_high, self.warning_low - values), 0.0)
+
+    # Time in each band and every excursion outside the normal band over a history of int64 ns timestamps
+    # max_gap_seconds caps the time credited to a reading so gaps in the data are not counted as time in a band
+    def excursion_analytics(self, timestamps, values, max_gap_seconds=900):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return {'time_in_band': {name: 0.0 for name in BAND_NAMES}, 'excursions': []}
+
+        levels = self.classify(values)
+        # Each reading stands for the time until the next one, the last one for the typical interval
+        intervals = np.diff(timestamps) / 1e9
+        typical_interval = float(np.median(intervals)) if len(intervals) else 0.0
+        durations = np.minimum(np.append(intervals, typical_interval), max_gap_seconds)
+        time_in_band = np.bincount(levels, weights=durations, minlength=len(BAND_NAMES))
+
+        # Excursions are runs of consecutive readings outside the normal band
+        outside = np.concatenate(([False], levels > NORMAL, [False]))
+        edges = np.flatnonzero(np.diff(outside.astype(np.int8)))
+        starts, ends = edges[0::2], edges[1::2] - 1
+        excursions = []
+        if len(starts):
+            deviation = self.deviation(values)
+            peak_deviation = np.maximum.reduceat(deviation, starts)
+            peak_level = np.maximum.reduceat(levels, starts)
+            # reduceat spans from one start to the next, the normal readings in between add nothing to these
+            run_durations = np.add.reduceat(durations * (levels > NORMAL), starts)
+            for index, (start, end) in enumerate(zip(starts, ends)):
+                peak_index = start + int(np.argmax(deviation[start:end + 1]))
+                excursions.append({
+                    'start': int(timestamps[start]),
+                    'end': int(timestamps[end]),
+                    'duration_seconds': float(run_durations[index]),
+                    'band': BAND_NAMES[int(peak_level[index])],
+                    'peak_value': float(values[peak_index]),
+                    'peak_deviation': float(peak_deviation[index]),
+                })
+
+        return {
+            'time_in_band': {name: float(seconds) for name, seconds in zip(BAND_NAMES, time_in_band)},
+            'excursions': excursions,
+        }
+
+
+# Function to format excursion analytics for the dashboard: time in each band with fractions and the most recent excursions first
+def summarise_excursions(analytics, limit=20):
+    total_seconds = sum(analytics['time_in_band'].values())
+    excursions = analytics['excursions'][::-1][:limit]
+    return {
+        'time_in_band': {
+            band: {'seconds': seconds, 'fraction': seconds / total_seconds if total_seconds else 0.0}
+            for band, seconds in analytics['time_in_band'].items()
+        },
+        'excursion_count': len(analytics['excursions']),
+        'excursions': [
+            dict(excursion, start=format_minute(excursion['start']), end=format_minute(excursion['end']))
+            for excursion in excursions
+        ],
+    }
+
+
+# Function to format an int64 ns UTC timestamp as 'YYYY-MM-DD HH:MM'
+def format_minute(timestamp):
+    return str(np.datetime_as_string(np.datetime64(int(timestamp), 'ns'), unit='m')).replace('T', ' ')
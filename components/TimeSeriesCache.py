@@ -0,0 +1,232 @@
+# TimeSeriesCache.py
+# Imports
+import os
+import re
+import threading
+import time
+import numpy as np
+import pandas as pd
+from components.Metrics import metrics
+
+
+# Holds the cached window for a single measurement as contiguous timestamp/value arrays
+class SeriesBuffer:
+    def __init__(self, timestamps=None, values=None):
+        # Timestamps are stored as int64 nanoseconds since the epoch (UTC), values as float64
+        self.timestamps = np.asarray(timestamps if timestamps is not None else [], dtype=np.int64)
+        self.values = np.asarray(values if values is not None else [], dtype=np.float64)
+        # Monotonic time of the last successful refresh against InfluxDB
+        self.last_refresh = 0.0
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    # Timestamp (ns) of the newest cached point, or None if the buffer is empty
+    def last_timestamp(self):
+        return int(self.timestamps[-1]) if len(self.timestamps) else None
+
+    # Append new points, keeping the arrays sorted and free of duplicate timestamps
+    def extend(self, timestamps, values):
+        if len(timestamps) == 0:
+            return 0
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = np.asarray(timestamps, dtype=np.int64)[order]
+        values = np.asarray(values, dtype=np.float64)[order]
+        # Only keep points strictly newer than what is already cached
+        last = self.last_timestamp()
+        if last is not None:
+            newer = timestamps > last
+            timestamps, values = timestamps[newer], values[newer]
+        # Drop duplicate timestamps within the fetched block
+        if len(timestamps) > 1:
+            unique = np.concatenate(([True], np.diff(timestamps) > 0))
+            timestamps, values = timestamps[unique], values[unique]
+        if len(timestamps):
+            self.timestamps = np.concatenate((self.timestamps, timestamps))
+            self.values = np.concatenate((self.values, values))
+        return len(timestamps)
+
+    # Drop points older than the cutoff (ns) from the front of the arrays
+    def expire(self, cutoff):
+        start = int(np.searchsorted(self.timestamps, cutoff, side="left"))
+        if start:
+            # Copy so the expired prefix can be released instead of being kept alive by a view
+            self.timestamps = self.timestamps[start:].copy()
+            self.values = self.values[start:].copy()
+        return start
+
+
+# Per-measurement cache of the rolling InfluxDB window that only fetches points newer than the last cached one
+class TimeSeriesCache:
+    def __init__(self, query_api, bucket, org, window_days=30, refresh_interval=30, snapshot_dir=None):
+        # query_api only needs a query(org=..., query=...) method returning Flux tables, so a stub can be used in tests
+        self.query_api = query_api
+        self.bucket = bucket
+        self.org = org
+        self.window = pd.Timedelta(days=window_days)
+        # Minimum number of seconds between two Influx queries for the same measurement
+        self.refresh_interval = refresh_interval
+        # Directory for the on-disk snapshots, or None to keep the cache in memory only
+        self.snapshot_dir = snapshot_dir
+        self._buffers = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    # Get (or create) the lock guarding a single measurement
+    def _measurement_lock(self, measurement):
+        with self._lock:
+            if measurement not in self._locks:
+                self._locks[measurement] = threading.Lock()
+            return self._locks[measurement]
+
+    # Format a timestamp (ns) as a Flux time literal with full nanosecond precision
+    @staticmethod
+    def _flux_time(timestamp):
+        seconds, nanoseconds = divmod(timestamp, 10**9)
+        return pd.Timestamp(seconds, unit="s", tz="UTC").strftime("%Y-%m-%dT%H:%M:%S") + f".{nanoseconds:09d}Z"
+
+    # Build one Flux query covering several measurements, either for the full window or, when since maps each
+    # measurement to its last cached timestamp (ns), only for the points after that measurement's own timestamp
+    def _build_query(self, measurements, since=None):
+        if since is None:
+            start = f"-{self.window.days}d"
+            measurement_filter = " or ".join(f'r._measurement == "{measurement}"' for measurement in measurements)
+        else:
+            # Flux range start is inclusive, so start one nanosecond after the oldest last cached point
+            start = self._flux_time(min(since[measurement] for measurement in measurements) + 1)
+            # Each measurement is filtered from its own last point, so a sensor that went quiet does not
+            # make every refresh re-download the history of the others since it last reported
+            measurement_filter = " or ".join(
+                f'(r._measurement == "{measurement}" and r._time > {self._flux_time(since[measurement])})'
+                for measurement in measurements
+            )
+        return (
+            f'from(bucket: "{self.bucket}") |> range(start: {start}) '
+            f'|> filter(fn: (r) => {measurement_filter}) '
+            f'|> filter(fn: (r) => exists r._value)'
+        )
+
+    # Run a grouped query and split the returned records into timestamp/value arrays per measurement
+    def _fetch(self, measurements, since=None):
+        with metrics.stage('influx_query'):
+            result = self.query_api.query(org=self.org, query=self._build_query(measurements, since))
+        metrics.inc('influx_queries_total')
+        points = {measurement: ([], []) for measurement in measurements}
+        fetched = 0
+        with metrics.stage('influx_records'):
+            for table in result:
+                for record in table.records:
+                    timestamps, values = points.setdefault(record.get_measurement(), ([], []))
+                    timestamps.append(pd.Timestamp(record.get_time()).value)
+                    values.append(record.get_value())
+                    fetched += 1
+        metrics.inc('influx_points_fetched_total', fetched)
+        return {
+            measurement: (np.array(timestamps, dtype=np.int64), np.array(values, dtype=np.float64))
+            for measurement, (timestamps, values) in points.items()
+        }
+
+    # Fetch like _fetch, but on a query error serve what is cached instead of failing the request
+    def _try_fetch(self, measurements, since=None):
+        try:
+            return self._fetch(measurements, since)
+        except Exception as e:
+            metrics.inc('influx_query_failures_total')
+            print(f"InfluxDB query failed, serving cached data for {', '.join(measurements)}: {e}")
+            return {}
+
+    # Path of the snapshot file for a measurement
+    def _snapshot_path(self, measurement):
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", measurement)
+        return os.path.join(self.snapshot_dir, f"{safe_name}.npz")
+
+    # Load a measurement from its on-disk snapshot, returning an empty buffer if there is none
+    def _load_snapshot(self, measurement):
+        if not self.snapshot_dir:
+            return SeriesBuffer()
+        path = self._snapshot_path(measurement)
+        try:
+            with np.load(path) as snapshot:
+                return SeriesBuffer(snapshot["timestamps"], snapshot["values"])
+        except FileNotFoundError:
+            return SeriesBuffer()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable cache snapshot {path}: {e}")
+            return SeriesBuffer()
+
+    # Write a measurement to disk, replacing the previous snapshot atomically
+    def _save_snapshot(self, measurement, buffer):
+        if not self.snapshot_dir:
+            return
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = self._snapshot_path(measurement)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as snapshot:
+                np.savez(snapshot, timestamps=buffer.timestamps, values=buffer.values)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Failed to save cache snapshot {path}: {e}")
+
+    # Bring a measurement up to date and return its timestamp (ns) and value arrays
+    # The arrays are replaced rather than modified on update, so callers can hold on to them without copying
+    def refresh(self, measurement, force=False):
+        return self.refresh_many([measurement], force)[measurement]
+
+    # Bring several measurements up to date with one Influx round trip and return their arrays by measurement
+    def refresh_many(self, measurements, force=False):
+        measurements = sorted(set(measurements))
+        # Always take the per-measurement locks in the same order so concurrent fleet refreshes cannot deadlock
+        locks = [self._measurement_lock(measurement) for measurement in measurements]
+        for lock in locks:
+            lock.acquire()
+        try:
+            now = time.monotonic()
+            cutoff = (pd.Timestamp.now(tz="UTC") - self.window).value
+            buffers = {}
+            due = []
+            for measurement in measurements:
+                buffer = self._buffers.get(measurement)
+                if buffer is None:
+                    buffer = self._load_snapshot(measurement)
+                    self._buffers[measurement] = buffer
+                buffers[measurement] = buffer
+                if force or not buffer.last_refresh or now - buffer.last_refresh >= self.refresh_interval:
+                    due.append(measurement)
+                    metrics.inc('cache_requests_total', cache='series', result='miss')
+                else:
+                    metrics.inc('cache_requests_total', cache='series', result='hit')
+
+            # Drop expired points first so a stale snapshot falls back to fetching the full window
+            expired = {measurement: buffers[measurement].expire(cutoff) for measurement in due}
+            # Empty buffers need the full window, the rest only need points newer than their own last timestamp
+            empty = [measurement for measurement in due if buffers[measurement].last_timestamp() is None]
+            cached = [measurement for measurement in due if buffers[measurement].last_timestamp() is not None]
+            fetched = {}
+            if empty:
+                fetched.update(self._try_fetch(empty))
+            if cached:
+                fetched.update(self._try_fetch(cached, {measurement: buffers[measurement].last_timestamp() for measurement in cached}))
+
+            for measurement in due:
+                buffer = buffers[measurement]
+                # Also set after a failed query, so an InfluxDB outage is retried once per refresh_interval rather than on every request
+                # extend() only keeps points newer than this buffer's own last timestamp
+                timestamps, values = fetched.get(measurement, (np.empty(0, dtype=np.int64), np.empty(0)))
+                added = buffer.extend(timestamps, values)
+                buffer.last_refresh = now
+                if added or expired[measurement]:
+                    self._save_snapshot(measurement, buffer)
+
+            return {measurement: (buffer.timestamps, buffer.values) for measurement, buffer in buffers.items()}
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    # Return the cached window as a DataFrame in the same shape the dashboard used to build from Influx records
+    def get_dataframe(self, measurement):
+        timestamps, values = self.refresh(measurement)
+        return pd.DataFrame({
+            "timestamp": pd.to_datetime(timestamps, unit="ns", utc=True),
+            "value": values,
+        })
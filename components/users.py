@@ -0,0 +1,4 @@
+# users.py
+users = {
+    'Aaron': 'password1',
+}
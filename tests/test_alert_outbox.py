@@ -0,0 +1,79 @@
+# test_alert_outbox.py
+# Run from the repository root with: python -m pytest
+# Imports
+from datetime import datetime, timedelta
+from components.AlertOutbox import AlertOutbox
+
+SENSOR = "fridge_temperature"
+NOW = datetime(2024, 4, 1, 12, 0, 0)
+
+
+# Local fake sender recording every delivery, failing the first `failures` calls
+class FakeSender:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    def __call__(self, recipient, subject, message):
+        self.calls.append((recipient, subject, message))
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("delivery failed")
+
+
+def make_outbox(senders, path=None):
+    # No backoff so retries run straight away, workers are not started so delivery is driven by the test
+    return AlertOutbox(senders, path=path, cooldown_hours=2, max_retries=3, backoff_seconds=0)
+
+
+def enqueue(outbox, message="Fridge too warm", current_time=NOW):
+    return outbox.enqueue(SENSOR, "critical", "ops@example.com", "+353000000", "Alert", message, current_time)
+
+
+def test_repeated_alert_is_merged_into_the_pending_one():
+    email = FakeSender()
+    outbox = make_outbox({'email': email})
+    assert enqueue(outbox, "first") == 'queued'
+    assert enqueue(outbox, "second") == 'merged'
+    assert outbox.pending_count() == 1
+
+    assert outbox.deliver(outbox._key(SENSOR, "critical"))
+    # One delivery carrying the newest message
+    assert email.calls == [("ops@example.com", "Alert", "second")]
+    assert outbox.pending_count() == 0
+
+
+def test_alert_within_the_cooldown_is_suppressed():
+    outbox = make_outbox({'email': FakeSender()})
+    enqueue(outbox)
+    outbox.deliver(outbox._key(SENSOR, "critical"))
+
+    assert enqueue(outbox, current_time=datetime.now() + timedelta(hours=1)) == 'suppressed'
+    assert outbox.suppressed_count == 1
+    assert enqueue(outbox, current_time=datetime.now() + timedelta(hours=3)) == 'queued'
+
+
+def test_partial_failure_only_retries_the_failed_channel():
+    email = FakeSender()
+    sms = FakeSender(failures=2)
+    outbox = make_outbox({'email': email, 'sms': sms})
+    enqueue(outbox)
+
+    assert outbox.deliver(outbox._key(SENSOR, "critical"))
+    assert len(email.calls) == 1
+    assert len(sms.calls) == 3
+    assert sms.calls[-1][0] == "+353000000"
+
+
+def test_pending_alerts_are_requeued_from_disk_after_a_restart(tmp_path):
+    path = str(tmp_path / "alert_outbox.json")
+    outbox = make_outbox({'email': FakeSender()}, path=path)
+    enqueue(outbox, "before restart")
+
+    # A new outbox on the same file picks the alert up again and delivers it
+    email = FakeSender()
+    restarted = make_outbox({'email': email}, path=path)
+    assert restarted.pending_count() == 1
+    key = restarted._queue.get_nowait()
+    assert restarted.deliver(key)
+    assert email.calls == [("ops@example.com", "Alert", "before restart")]
@@ -0,0 +1,76 @@
+# test_backtest.py
+# Run from the repository root with: python -m pytest
+# Imports
+import numpy as np
+import pytest
+from components.ModelBackends import WEIGHT_NAMES
+from components.PredictionModel import PredictionModel
+from components.Backtest import alert_accuracy
+
+THRESHOLDS = {'WARNING_TEMP_LOW': 1.0, 'WARNING_TEMP_HIGH': 6.0, 'CRITICAL_TEMP_LOW': -1.0, 'CRITICAL_TEMP_HIGH': 8.0}
+
+
+@pytest.fixture
+def prediction_model(tmp_path):
+    # Windowing does not run the model, so placeholder weights are enough to construct it
+    weights_path = str(tmp_path / "weights.npz")
+    np.savez(weights_path, **{name: np.zeros(1) for name in WEIGHT_NAMES})
+    return PredictionModel(None, sequence_length=5, prediction_steps=3, backend='numpy', weights_path=weights_path)
+
+
+# Loop versions of the windowing, as create_sequences was written before the sliding window rewrite
+def loop_sequences(data, sequence_length, prediction_steps):
+    return np.array([data[i - sequence_length:i] for i in range(sequence_length, len(data) - prediction_steps + 1)])
+
+
+def loop_targets(data, sequence_length, prediction_steps):
+    return np.array([data[i:i + prediction_steps] for i in range(sequence_length, len(data) - prediction_steps + 1)])
+
+
+@pytest.mark.parametrize("shape", [(20,), (20, 1)])
+def test_windows_match_the_original_loops(prediction_model, shape):
+    data = np.arange(20, dtype=np.float64).reshape(shape)
+    np.testing.assert_array_equal(prediction_model.create_sequences(data), loop_sequences(data, 5, 3))
+    np.testing.assert_array_equal(prediction_model.create_targets(data), loop_targets(data, 5, 3))
+    assert prediction_model.create_sequences(data).shape == (13, 5) + shape[1:]
+    assert prediction_model.create_targets(data).shape == (13, 3) + shape[1:]
+
+
+@pytest.mark.parametrize("length", [0, 4, 7])
+def test_too_short_data_gives_no_windows(prediction_model, length):
+    # 7 values are one short of a 5 value window followed by 3 targets
+    data = np.arange(length, dtype=np.float64).reshape(-1, 1)
+    assert prediction_model.create_sequences(data).shape == (0, 5, 1)
+    assert prediction_model.create_targets(data).shape == (0, 3, 1)
+
+
+def test_shortest_data_gives_one_window(prediction_model):
+    assert len(prediction_model.create_sequences(np.arange(8.0))) == 1
+    np.testing.assert_array_equal(prediction_model.create_targets(np.arange(8.0)), [[5.0, 6.0, 7.0]])
+
+
+def test_alert_accuracy_counts_hits_misses_and_false_alarms():
+    predictions = np.array([
+        [4.0, 7.0, 4.0],  # warning predicted and seen: warning hit
+        [4.0, 4.0, 4.0],  # nothing predicted, critical seen: critical miss
+        [9.0, 4.0, 4.0],  # critical predicted, nothing seen: critical false alarm
+        [7.0, 9.0, 4.0],  # first value outside the normal band is a warning, warning seen: warning hit
+        [4.0, 4.0, 9.0],  # critical predicted and seen: critical hit
+    ])
+    targets = np.array([
+        [4.0, 7.0, 4.0],
+        [4.0, 9.0, 4.0],
+        [4.0, 4.0, 4.0],
+        [4.0, 4.0, 7.0],
+        [4.0, 9.0, 9.0],
+    ])
+    results = alert_accuracy(predictions, targets, THRESHOLDS)
+    assert results['warning_predictive'] == {'hits': 2, 'misses': 0, 'false_alarms': 0, 'hit_rate': 1.0, 'false_alarm_rate': 0.0}
+    assert results['critical_predictive'] == {'hits': 1, 'misses': 1, 'false_alarms': 1, 'hit_rate': 0.5, 'false_alarm_rate': 0.5}
+
+
+def test_alert_accuracy_rates_are_none_without_alerts():
+    normal = np.full((3, 3), 4.0)
+    results = alert_accuracy(normal, normal, THRESHOLDS)
+    assert results['warning_predictive']['hit_rate'] is None
+    assert results['critical_predictive']['false_alarm_rate'] is None
@@ -0,0 +1,65 @@
+# test_live_updates.py
+# Run from the repository root with: python -m pytest
+# Imports
+import numpy as np
+import pandas as pd
+from components.LiveUpdates import LiveUpdates
+from components.ThresholdEngine import ThresholdEngine
+
+SENSORS = [{'id': 'fridge', 'name': 'Fridge', 'measurement': 'fridge_temperature'}]
+NOW = pd.Timestamp.now(tz="UTC").floor("min")
+
+
+# Function to build a cached series of readings 5 minutes apart ending now
+def make_series(values):
+    timestamps = pd.date_range(end=NOW, periods=len(values), freq="5min").asi8
+    return {'fridge_temperature': (timestamps, np.asarray(values, dtype=np.float64))}
+
+
+def make_live_updates(max_queue_size=100):
+    return LiveUpdates(SENSORS, lambda: ThresholdEngine(1.0, 6.0, -1.0, 8.0), max_queue_size=max_queue_size)
+
+
+# Function to read the event names from a list of SSE messages
+def event_names(messages):
+    return [line.split(': ', 1)[1] for message in messages for line in message.split('\n') if line.startswith('event: ')]
+
+
+def test_stream_starts_with_the_current_state():
+    live_updates = make_live_updates()
+    live_updates.publish_update(make_series([4.0, 7.0, 4.0]), {})
+
+    stream = live_updates.stream('fridge')
+    messages = [next(stream) for _ in range(4)]
+    assert event_names(messages) == ['readings', 'status', 'excursions']
+    assert '"reset": true' in messages[1]
+    stream.close()
+    assert live_updates.subscriber_count() == 0
+
+
+def test_slow_client_is_dropped_and_its_stream_ends():
+    live_updates = make_live_updates(max_queue_size=2)
+    live_updates.publish_update(make_series([4.0]), {})
+    stream = live_updates.stream('fridge')
+    # Read the retry line and the snapshot, then stop reading while new readings keep arriving
+    for _ in range(4):
+        next(stream)
+    for count in range(2, 6):
+        live_updates.publish_update(make_series([4.0] * count), {})
+    assert live_updates.subscriber_count() == 0
+
+    # The stream finishes instead of sending keepalives forever, so EventSource reconnects
+    assert list(stream) == []
+
+
+def test_streams_beyond_the_limit_are_refused_until_one_closes():
+    live_updates = LiveUpdates(SENSORS, lambda: ThresholdEngine(1.0, 6.0, -1.0, 8.0), max_streams=2)
+    first = live_updates.stream('fridge')
+    second = live_updates.stream('fridge')
+    assert live_updates.stream('fridge') is None
+
+    # Closing a stream that was never read (client gone before the first byte) frees its slot too
+    first.close()
+    assert live_updates.subscriber_count() == 1
+    assert live_updates.stream('fridge') is not None
+    second.close()
@@ -0,0 +1,97 @@
+# test_model_backends.py
+# Run from the repository root with: python -m pytest
+# Imports
+import numpy as np
+import pytest
+from components.ModelBackends import WEIGHT_NAMES, CHECKPOINT_KEYS, lstm_forward, NumpyLSTMBackend, export_numpy_weights
+
+# Small version of the dashboard model: LSTM(4, return_sequences) -> LSTM(3) -> Dense(5, relu) -> Dense(2)
+SHAPES = {
+    'lstm_kernel': (1, 16), 'lstm_recurrent_kernel': (4, 16), 'lstm_bias': (16,),
+    'lstm_1_kernel': (4, 12), 'lstm_1_recurrent_kernel': (3, 12), 'lstm_1_bias': (12,),
+    'dense_kernel': (3, 5), 'dense_bias': (5,),
+    'dense_1_kernel': (5, 2), 'dense_1_bias': (2,),
+}
+
+
+def random_weights(seed=0):
+    rng = np.random.default_rng(seed)
+    return {name: rng.normal(0, 0.5, SHAPES[name]).astype(np.float32) for name in WEIGHT_NAMES}
+
+
+# Reference LSTM written out one sample, one step and one gate at a time (Keras gate order i, f, c, o)
+def reference_lstm(inputs, kernel, recurrent_kernel, bias, return_sequences=False):
+    units = recurrent_kernel.shape[0]
+    gates = [slice(index * units, (index + 1) * units) for index in range(4)]
+    sequences = []
+    for sample in inputs.astype(np.float64):
+        h = np.zeros(units)
+        c = np.zeros(units)
+        outputs = []
+        for x in sample:
+            i, f, g, o = (x @ kernel[:, gate] + h @ recurrent_kernel[:, gate] + bias[gate] for gate in gates)
+            i, f, o = (1 / (1 + np.exp(-gate)) for gate in (i, f, o))
+            c = f * c + i * np.tanh(g)
+            h = o * np.tanh(c)
+            outputs.append(h)
+        sequences.append(outputs if return_sequences else h)
+    return np.array(sequences)
+
+
+def reference_model(batch, w):
+    x = reference_lstm(batch, w['lstm_kernel'], w['lstm_recurrent_kernel'], w['lstm_bias'], return_sequences=True)
+    x = reference_lstm(x, w['lstm_1_kernel'], w['lstm_1_recurrent_kernel'], w['lstm_1_bias'])
+    x = np.maximum(x @ w['dense_kernel'] + w['dense_bias'], 0.0)
+    return x @ w['dense_1_kernel'] + w['dense_1_bias']
+
+
+def test_lstm_forward_matches_the_reference_lstm():
+    w = random_weights()
+    inputs = np.random.default_rng(1).random((3, 7, 1), dtype=np.float32)
+    for return_sequences in (True, False):
+        expected = reference_lstm(inputs, w['lstm_kernel'], w['lstm_recurrent_kernel'], w['lstm_bias'], return_sequences)
+        actual = lstm_forward(inputs, w['lstm_kernel'], w['lstm_recurrent_kernel'], w['lstm_bias'], return_sequences)
+        np.testing.assert_allclose(actual, expected, atol=1e-5)
+
+
+def test_numpy_backend_matches_the_reference_model(tmp_path):
+    w = random_weights()
+    weights_path = str(tmp_path / "weights.npz")
+    np.savez(weights_path, **w)
+    batch = np.random.default_rng(2).random((4, 9, 1), dtype=np.float32)
+    np.testing.assert_allclose(NumpyLSTMBackend(weights_path).infer(batch), reference_model(batch, w), atol=1e-5)
+
+
+def test_numpy_backend_matches_keras():
+    tf = pytest.importorskip("tensorflow")
+    model = tf.keras.Sequential([
+        tf.keras.Input((9, 1)),
+        tf.keras.layers.LSTM(4, return_sequences=True),
+        tf.keras.layers.LSTM(3),
+        tf.keras.layers.Dense(5, activation='relu'),
+        tf.keras.layers.Dense(2),
+    ])
+    batch = np.random.default_rng(3).random((4, 9, 1), dtype=np.float32)
+    backend = NumpyLSTMBackend.__new__(NumpyLSTMBackend)
+    backend.weights = dict(zip(WEIGHT_NAMES, model.get_weights()))
+    np.testing.assert_allclose(backend.infer(batch), model(batch).numpy(), atol=1e-5)
+
+
+def test_export_reads_the_lstm_and_dense_weights_from_the_savedmodel_layout(tmp_path):
+    tf = pytest.importorskip("tensorflow")
+    w = random_weights()
+    # Checkpoint laid out like the saved dashboard model: LSTM weights as variables/0..5, Dense weights under their layers
+    dense = {}
+    for layer in ('layer_with_weights-2', 'layer_with_weights-3'):
+        dense[layer] = tf.Module()
+    for name, key in CHECKPOINT_KEYS.items():
+        if key.startswith('layer_with_weights'):
+            layer, attribute = key.split('/')
+            setattr(dense[layer], attribute, tf.Variable(w[name]))
+    lstm_variables = [tf.Variable(w[name]) for name in WEIGHT_NAMES[:6]]
+    tf.train.Checkpoint(variables=lstm_variables, **dense).write(str(tmp_path / "model" / "variables" / "variables"))
+
+    weights_path = str(tmp_path / "weights.npz")
+    export_numpy_weights(str(tmp_path / "model"), weights_path)
+    batch = np.random.default_rng(4).random((2, 9, 1), dtype=np.float32)
+    np.testing.assert_allclose(NumpyLSTMBackend(weights_path).infer(batch), reference_model(batch, w), atol=1e-5)
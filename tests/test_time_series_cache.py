@@ -0,0 +1,153 @@
+# test_time_series_cache.py
+# Run from the repository root with: python -m pytest
+# Imports
+import numpy as np
+import pandas as pd
+from components.TimeSeriesCache import TimeSeriesCache
+
+MEASUREMENT = "fridge_temperature"
+# Fixed reference time so every point in a test is placed relative to the same instant
+NOW = pd.Timestamp.now(tz="UTC").floor("min")
+
+
+# Minimal stand-ins for the Flux records and tables returned by the InfluxDB query API
+class StubRecord:
+    def __init__(self, measurement, time, value):
+        self.measurement = measurement
+        self.time = time
+        self.value = value
+
+    def get_measurement(self):
+        return self.measurement
+
+    def get_time(self):
+        return self.time
+
+    def get_value(self):
+        return self.value
+
+
+class StubTable:
+    def __init__(self, records):
+        self.records = records
+
+
+# Query API stub returning the queued responses in order and recording every query it was sent
+class StubQueryApi:
+    def __init__(self):
+        self.queries = []
+        self.responses = []
+
+    def respond(self, points, measurement=MEASUREMENT):
+        self.responses.append([StubTable([StubRecord(measurement, time, value) for time, value in points])])
+
+    def query(self, org, query):
+        self.queries.append(query)
+        return self.responses.pop(0) if self.responses else []
+
+
+# Function to build timezone-aware timestamps the given number of minutes before now
+def minutes_ago(minutes):
+    return NOW - pd.Timedelta(minutes=minutes)
+
+
+def make_cache(query_api, snapshot_dir=None):
+    # refresh_interval=0 so every refresh goes to the stub
+    return TimeSeriesCache(query_api, "bucket", "org", window_days=30, refresh_interval=0, snapshot_dir=snapshot_dir)
+
+
+def test_first_refresh_fetches_full_window_then_only_newer_points():
+    query_api = StubQueryApi()
+    cache = make_cache(query_api)
+    query_api.respond([(minutes_ago(10), 1.0), (minutes_ago(5), 2.0)])
+    timestamps, values = cache.refresh(MEASUREMENT)
+    assert values.tolist() == [1.0, 2.0]
+    assert "range(start: -30d)" in query_api.queries[0]
+
+    query_api.respond([(minutes_ago(0), 3.0)])
+    timestamps, values = cache.refresh(MEASUREMENT)
+    assert values.tolist() == [1.0, 2.0, 3.0]
+    # The incremental query starts just after the last cached point instead of re-reading the window
+    assert "-30d" not in query_api.queries[1]
+    assert minutes_ago(5).strftime("%Y-%m-%dT%H:%M:%S") in query_api.queries[1]
+
+
+def test_points_older_than_the_window_expire_from_the_front():
+    query_api = StubQueryApi()
+    cache = make_cache(query_api)
+    old = NOW - pd.Timedelta(days=31)
+    query_api.respond([(old, 1.0), (minutes_ago(5), 2.0)])
+    cache.refresh(MEASUREMENT)
+
+    timestamps, values = cache.refresh(MEASUREMENT)
+    assert values.tolist() == [2.0]
+    assert timestamps[0] == minutes_ago(5).value
+
+
+def test_duplicate_and_out_of_order_points_are_sorted_and_deduplicated():
+    query_api = StubQueryApi()
+    cache = make_cache(query_api)
+    query_api.respond([(minutes_ago(5), 2.0), (minutes_ago(10), 1.0), (minutes_ago(5), 2.5)])
+    timestamps, values = cache.refresh(MEASUREMENT)
+    assert np.all(np.diff(timestamps) > 0)
+    assert values.tolist() == [1.0, 2.0]
+
+    # Points at or before the last cached timestamp are ignored on the next refresh
+    query_api.respond([(minutes_ago(10), 9.0), (minutes_ago(5), 9.0), (minutes_ago(0), 3.0)])
+    timestamps, values = cache.refresh(MEASUREMENT)
+    assert values.tolist() == [1.0, 2.0, 3.0]
+
+
+def test_cache_reloads_from_snapshot_and_only_fetches_newer_points(tmp_path):
+    query_api = StubQueryApi()
+    query_api.respond([(minutes_ago(10), 1.0), (minutes_ago(5), 2.0)])
+    make_cache(query_api, snapshot_dir=str(tmp_path)).refresh(MEASUREMENT)
+    assert list(tmp_path.glob("*.npz"))
+
+    # A new cache (e.g. after a restart) starts from the snapshot and sends an incremental query
+    restarted_api = StubQueryApi()
+    restarted_api.respond([(minutes_ago(0), 3.0)])
+    timestamps, values = make_cache(restarted_api, snapshot_dir=str(tmp_path)).refresh(MEASUREMENT)
+    assert values.tolist() == [1.0, 2.0, 3.0]
+    assert len(restarted_api.queries) == 1
+    assert "-30d" not in restarted_api.queries[0]
+
+
+def test_grouped_refresh_filters_each_measurement_from_its_own_last_point():
+    query_api = StubQueryApi()
+    cache = make_cache(query_api)
+    quiet = "quiet_temperature"
+    # One sensor reporting every few minutes and one that has been silent for 25 days
+    query_api.responses.append([
+        StubTable([StubRecord(MEASUREMENT, minutes_ago(5), 2.0)]),
+        StubTable([StubRecord(quiet, NOW - pd.Timedelta(days=25), 7.0)]),
+    ])
+    cache.refresh_many([MEASUREMENT, quiet])
+
+    query_api.respond([(minutes_ago(0), 3.0)])
+    series = cache.refresh_many([MEASUREMENT, quiet])
+    assert len(query_api.queries) == 2
+    assert series[MEASUREMENT][1].tolist() == [2.0, 3.0]
+    assert series[quiet][1].tolist() == [7.0]
+    query = query_api.queries[1]
+    assert f'r._measurement == "{MEASUREMENT}" and r._time > {minutes_ago(5).strftime("%Y-%m-%dT%H:%M:%S")}' in query
+    assert f'r._measurement == "{quiet}" and r._time > {(NOW - pd.Timedelta(days=25)).strftime("%Y-%m-%dT%H:%M:%S")}' in query
+
+
+def test_query_errors_serve_the_cached_window_and_wait_before_retrying():
+    query_api = StubQueryApi()
+    cache = TimeSeriesCache(query_api, "bucket", "org", window_days=30, refresh_interval=60)
+    query_api.respond([(minutes_ago(10), 1.0), (minutes_ago(5), 2.0)])
+    cache.refresh(MEASUREMENT, force=True)
+
+    def failing_query(org, query):
+        query_api.queries.append(query)
+        raise ConnectionError("InfluxDB unavailable")
+    query_api.query = failing_query
+
+    timestamps, values = cache.refresh(MEASUREMENT, force=True)
+    assert values.tolist() == [1.0, 2.0]
+    # Within the refresh interval the failed measurement is served from the cache without querying again
+    cache.refresh(MEASUREMENT)
+    cache.refresh(MEASUREMENT)
+    assert len(query_api.queries) == 2